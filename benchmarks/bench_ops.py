@@ -0,0 +1,220 @@
+"""Time every operation in pdfeditor.operations on synthetic PDFs and keep a history of the results.
+
+    python -m benchmarks.bench_ops run --pages 10 100 1000 --kinds text scanned mixed
+    python -m benchmarks.bench_ops run --pages 5000 --ops merge compress --repeat 1
+    python -m benchmarks.bench_ops compare --threshold 0.25
+
+Run from the repository root. ``run`` appends one entry (commit, versions and
+a row per operation/kind/size) to the history file; ``compare`` checks the
+latest entry against the one before it, or against ``--baseline`` (an index
+into the history or a commit prefix), and exits with status 1 when any
+operation got slower or hungrier than the threshold allows. Every
+measurement runs in a fresh process with an empty OCR cache.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.measure import isolated
+from benchmarks.synth import make_epub, make_images, make_pdf
+from pdfeditor.spool import NamedBytesIO
+
+HISTORY = os.path.join(os.path.dirname(__file__), 'history.json')
+PASSWORD = 'bench'
+# timings below this are mostly process noise and are never flagged
+MIN_SECONDS = 0.2
+
+
+def _calls(ops, data, pages):
+    half = max(pages // 2, 1)
+    pdf = lambda: io.BytesIO(data)
+    return {
+        'merge': lambda: ops.merge_pdfs([pdf(), pdf()]),
+        'split': lambda: ops.split_pdf(pdf(), f'1-{half},{half + 1}-{pages}' if pages > 1 else '1-1'),
+        'rotate': lambda: ops.rotate_pdf(pdf(), 90),
+        'crop': lambda: ops.crop_pdf(pdf(), (36, 36, 576, 756)),
+        'watermark': lambda: ops.add_watermark(pdf(), 'Confidential'),
+        'page_numbers': lambda: ops.add_page_numbers(pdf(), fmt='{prefix}{n:06d}', prefix='BENCH'),
+        'flatten': lambda: ops.flatten_pdf(pdf()),
+        'delete': lambda: ops.delete_pages(pdf(), list(range(1, pages + 1, 10))),
+        'insert': lambda: ops.insert_pages(pdf(), pdf(), half),
+        'encrypt': lambda: ops.encrypt_pdf(pdf(), PASSWORD),
+        'decrypt': lambda: ops.decrypt_pdf(ops.encrypt_pdf(pdf(), PASSWORD), PASSWORD),
+        'compress': lambda: ops.compress_pdf(pdf()),
+        'metadata': lambda: ops.extract_metadata(pdf()),
+        'extract_images': lambda: ops.extract_images(pdf()),
+        'to_images': lambda: ops.pdf_to_images(pdf(), dpi=100),
+        'images_to_pdf': lambda: ops.images_to_pdf(
+            [NamedBytesIO(b, n) for n, b in make_images(min(pages, 50))]),
+        'ocr': lambda: ops.ocr_pdf(pdf()),
+        'to_docx': lambda: ops.pdf_to_docx(pdf()),
+        'to_spreadsheet': lambda: ops.pdf_to_spreadsheet(pdf()),
+        'index': lambda: _index(ops, data),
+        # roughly `pages` A5 pages of book; the PDF kind does not apply
+        'ebook_to_pdf': lambda: ops.convert_ebook(NamedBytesIO(make_epub(max(pages // 20, 1)), 'book.epub'), 'pdf'),
+    }
+
+
+def _index(ops, data):
+    # into an empty index, so the text is always extracted; the output size is that of the index file
+    from pdfeditor.search import SearchIndex
+    index = SearchIndex(os.path.join(tempfile.mkdtemp(prefix='bench-index-'), 'search.db'))
+    ops.index_documents([NamedBytesIO(data, 'bench.pdf')], index=index)
+    return index.stats()['bytes']
+
+
+OPERATIONS = tuple(_calls(None, b'', 1))
+
+
+def output_size(out):
+    if isinstance(out, list):
+        return sum(output_size(o) for o in out)
+    if isinstance(out, bytes):
+        return len(out)
+    if isinstance(out, int):
+        return out
+    if hasattr(out, 'getbuffer'):
+        return out.getbuffer().nbytes
+    out.seek(0, os.SEEK_END)
+    return out.tell()
+
+
+def run(op, data, pages):
+    # a private OCR cache, set before pdfeditor.ocr_cache is imported, so OCR timings are always cold
+    os.environ['PDFEDITOR_OCR_CACHE'] = tempfile.mkdtemp(prefix='bench-ocr-')
+    from pdfeditor import operations as ops
+    return output_size(_calls(ops, data, pages)[op]())
+
+
+def measure(op, kind, pages, data, repeat=3):
+    """Best of ``repeat`` fresh-process runs of one operation, as a history row."""
+    row = {'op': op, 'kind': kind, 'pages': pages}
+    best = None
+    for _ in range(repeat):
+        r = isolated(run, op, data, pages)
+        if 'error' in r:
+            return dict(row, error=r['error'])
+        if best is None or r['seconds'] < best['seconds']:
+            best = r
+    row.update(seconds=round(best['seconds'], 4), pages_per_s=round(pages / best['seconds'], 2),
+               peak_rss_mb=round(best['peak_rss_mb'], 1), output_bytes=best['result'])
+    return row
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(__file__), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_history(path, history):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(history, f, indent=1)
+    os.replace(tmp, path)
+
+
+def _versions():
+    import pymupdf as fitz
+    return {'python': platform.python_version(), 'pymupdf': fitz.VersionBind, 'machine': platform.machine(),
+            'cpus': os.cpu_count()}
+
+
+def compare(old, new, threshold):
+    """Rows of (op, kind, pages, metric, old, new, change) for every metric that grew by more than threshold."""
+    before = {(r['op'], r['kind'], r['pages']): r for r in old['results'] if 'error' not in r}
+    flagged = []
+    for r in new['results']:
+        b = before.get((r['op'], r['kind'], r['pages']))
+        if b is None or 'error' in r:
+            continue
+        for metric in ('seconds', 'peak_rss_mb', 'output_bytes'):
+            if metric == 'seconds' and max(b[metric], r[metric]) < MIN_SECONDS:
+                continue
+            change = r[metric] / b[metric] - 1 if b[metric] else 0
+            if change > threshold:
+                flagged.append((r['op'], r['kind'], r['pages'], metric, b[metric], r[metric], change))
+    return flagged
+
+
+def _baseline(history, ref):
+    if ref is None:
+        return history[-2]
+    if ref.lstrip('-').isdigit():
+        return history[int(ref)]
+    for entry in reversed(history[:-1]):
+        if (entry.get('commit') or '').startswith(ref):
+            return entry
+    raise SystemExit(f'no history entry for commit {ref}')
+
+
+def cmd_run(args):
+    history = load_history(args.history)
+    entry = {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'commit': _commit(), **_versions(), 'results': []}
+    print(f'{"op":>15} {"kind":>8} {"pages":>6} {"seconds":>8} {"pages/s":>9} {"peak MB":>8} {"out MB":>8}')
+    for kind in args.kinds:
+        for pages in args.pages:
+            data = make_pdf(pages, kind)
+            for op in args.ops:
+                row = measure(op, kind, pages, data, args.repeat)
+                entry['results'].append(row)
+                if 'error' in row:
+                    print(f'{op:>15} {kind:>8} {pages:>6}  failed: {row["error"]}')
+                else:
+                    print(f'{op:>15} {kind:>8} {pages:>6} {row["seconds"]:8.2f} {row["pages_per_s"]:9.1f} '
+                          f'{row["peak_rss_mb"]:8.1f} {row["output_bytes"] / 1e6:8.2f}')
+    history.append(entry)
+    save_history(args.history, history)
+    print(f'saved to {args.history} ({len(history)} runs)')
+    return 0
+
+
+def cmd_compare(args):
+    history = load_history(args.history)
+    if len(history) < 2:
+        print('need at least two runs to compare')
+        return 0
+    old, new = _baseline(history, args.baseline), history[-1]
+    flagged = compare(old, new, args.threshold)
+    print(f'{new["commit"]} ({new["timestamp"]}) against {old["commit"]} ({old["timestamp"]}), '
+          f'threshold {args.threshold:.0%}')
+    for op, kind, pages, metric, a, b, change in flagged:
+        print(f'  REGRESSION {op} {kind} {pages}p {metric}: {a:g} -> {b:g} (+{change:.0%})')
+    if not flagged:
+        print('  no regressions')
+    return 1 if flagged else 0
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog='python -m benchmarks.bench_ops')
+    ap.add_argument('--history', default=HISTORY, help='JSON history file (default: benchmarks/history.json)')
+    sub = ap.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('run', help='benchmark operations and append the results to the history')
+    p.add_argument('--pages', type=int, nargs='+', default=[10, 100, 1000])
+    p.add_argument('--kinds', nargs='+', choices=['text', 'scanned', 'mixed'], default=['text', 'scanned', 'mixed'])
+    p.add_argument('--ops', nargs='+', choices=OPERATIONS, default=list(OPERATIONS))
+    p.add_argument('--repeat', type=int, default=3, help='keep the fastest of this many runs (default: 3)')
+    p = sub.add_parser('compare', help='flag regressions in the latest run')
+    p.add_argument('--baseline', help='history index or commit to compare against (default: the previous run)')
+    p.add_argument('--threshold', type=float, default=0.15, help='allowed relative growth (default: 0.15)')
+    args = ap.parse_args(argv)
+    return cmd_run(args) if args.command == 'run' else cmd_compare(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
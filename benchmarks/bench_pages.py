@@ -0,0 +1,142 @@
+"""Compare the PyPDF2 page-level operations the app used to ship with the PyMuPDF ones.
+
+    python -m benchmarks.bench_pages --pages 1000 5000 10000 --kind text
+
+Run from the repository root. Every (backend, operation) pair runs in a
+fresh process; output size shows whether shared fonts and images were
+copied more than once.
+"""
+import argparse
+import io
+
+from benchmarks.measure import isolated
+from benchmarks.synth import make_pdf
+
+PASSWORD = 'bench'
+
+
+# The PyPDF2 implementations as they were before the move to PyMuPDF.
+
+def _write(w):
+    buf = io.BytesIO()
+    w.write(buf)
+    return buf
+
+
+def pypdf2_merge(a, b):
+    import PyPDF2
+    merger = PyPDF2.PdfMerger()
+    for data in (a, b):
+        merger.append(io.BytesIO(data))
+    return _write(merger)
+
+
+def pypdf2_split(data, ranges):
+    import PyPDF2
+    reader = PyPDF2.PdfReader(io.BytesIO(data))
+    out = []
+    for rng in ranges.split(','):
+        start, end = map(int, rng.split('-'))
+        writer = PyPDF2.PdfWriter()
+        for i in range(start - 1, end):
+            writer.add_page(reader.pages[i])
+        out.append(_write(writer))
+    return out
+
+
+def pypdf2_delete(data, pages):
+    import PyPDF2
+    w = PyPDF2.PdfWriter()
+    for i, pg in enumerate(PyPDF2.PdfReader(io.BytesIO(data)).pages, 1):
+        if i not in pages:
+            w.add_page(pg)
+    return _write(w)
+
+
+def pypdf2_insert(base, ins, pos):
+    import PyPDF2
+    br, ir = PyPDF2.PdfReader(io.BytesIO(base)), PyPDF2.PdfReader(io.BytesIO(ins))
+    w = PyPDF2.PdfWriter()
+    for i in range(pos):
+        w.add_page(br.pages[i])
+    for pg in ir.pages:
+        w.add_page(pg)
+    for i in range(pos, len(br.pages)):
+        w.add_page(br.pages[i])
+    return _write(w)
+
+
+def pypdf2_encrypt(data, pwd):
+    import PyPDF2
+    w = PyPDF2.PdfWriter()
+    for pg in PyPDF2.PdfReader(io.BytesIO(data)).pages:
+        w.add_page(pg)
+    w.encrypt(pwd)
+    return _write(w)
+
+
+def pypdf2_decrypt(data, pwd):
+    import PyPDF2
+    rdr = PyPDF2.PdfReader(io.BytesIO(data))
+    if rdr.is_encrypted:
+        rdr.decrypt(pwd)
+    w = PyPDF2.PdfWriter()
+    for pg in rdr.pages:
+        w.add_page(pg)
+    return _write(w)
+
+
+def _size(out):
+    return sum(len(b.getvalue()) for b in out) if isinstance(out, list) else len(out.getvalue())
+
+
+def run(backend, op, data, pages):
+    from pdfeditor import operations as ops
+    half = pages // 2
+    ranges = f'1-{half},{half + 1}-{pages}'
+    every_tenth = list(range(1, pages + 1, 10))
+    if backend == 'pypdf2':
+        calls = {
+            'merge': lambda: pypdf2_merge(data, data),
+            'split': lambda: pypdf2_split(data, ranges),
+            'delete': lambda: pypdf2_delete(data, every_tenth),
+            'insert': lambda: pypdf2_insert(data, data, half),
+            'encrypt': lambda: pypdf2_encrypt(data, PASSWORD),
+            'decrypt': lambda: pypdf2_decrypt(pypdf2_encrypt(data, PASSWORD).getvalue(), PASSWORD),
+        }
+    else:
+        calls = {
+            'merge': lambda: ops.merge_pdfs([io.BytesIO(data), io.BytesIO(data)]),
+            'split': lambda: ops.split_pdf(io.BytesIO(data), ranges),
+            'delete': lambda: ops.delete_pages(io.BytesIO(data), every_tenth),
+            'insert': lambda: ops.insert_pages(io.BytesIO(data), io.BytesIO(data), half),
+            'encrypt': lambda: ops.encrypt_pdf(io.BytesIO(data), PASSWORD),
+            'decrypt': lambda: ops.decrypt_pdf(ops.encrypt_pdf(io.BytesIO(data), PASSWORD), PASSWORD),
+        }
+    return _size(calls[op]())
+
+
+OPERATIONS = ('merge', 'split', 'delete', 'insert', 'encrypt', 'decrypt')
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--pages', type=int, nargs='+', default=[1000, 5000, 10000])
+    ap.add_argument('--kind', choices=['text', 'scanned', 'mixed'], default='text')
+    ap.add_argument('--ops', nargs='+', choices=OPERATIONS, default=list(OPERATIONS))
+    args = ap.parse_args(argv)
+    print(f'{"pages":>6} {"op":>8} {"backend":>8} {"seconds":>8} {"pages/s":>9} {"peak MB":>8} {"out MB":>7}')
+    for pages in args.pages:
+        data = make_pdf(pages, args.kind)
+        for op in args.ops:
+            for backend in ('pypdf2', 'pymupdf'):
+                r = isolated(run, backend, op, data, pages)
+                if 'error' in r:
+                    print(f'{pages:>6} {op:>8} {backend:>8}  failed: {r["error"]}')
+                    continue
+                print(f'{pages:>6} {op:>8} {backend:>8} {r["seconds"]:8.2f} {pages / r["seconds"]:9.0f} '
+                      f'{r["peak_rss_mb"]:8.1f} {r["result"] / 1e6:7.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Compare PDF rasterization through pdf2image/poppler with the in-process PyMuPDF renderer.
+
+    python -m benchmarks.bench_render --pages 50 --kind mixed --dpi 150
+
+Run from the repository root. Each backend runs in a fresh process so peak
+RSS is not shared; poppler's own child processes are included in its figure.
+"""
+import argparse
+import io
+import os
+import tempfile
+
+from benchmarks.measure import isolated
+from benchmarks.synth import make_pdf
+
+
+def _poppler(data, dpi):
+    from pdf2image import convert_from_path
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
+    tmp.write(data)
+    tmp.close()
+    n = 0
+    for im in convert_from_path(tmp.name, dpi=dpi):
+        im.save(io.BytesIO(), 'PNG')
+        n += 1
+    os.unlink(tmp.name)
+    return n
+
+
+def _pymupdf(data, dpi):
+    from pdfeditor.render import open_pdf, render_pages
+    doc = open_pdf(data)
+    n = 0
+    for _, pix in render_pages(doc, dpi):
+        pix.tobytes('png')
+        n += 1
+    doc.close()
+    return n
+
+
+BACKENDS = {'poppler': _poppler, 'pymupdf': _pymupdf}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--pages', type=int, default=50)
+    ap.add_argument('--kind', choices=['text', 'scanned', 'mixed'], default='mixed')
+    ap.add_argument('--dpi', type=int, default=150)
+    args = ap.parse_args(argv)
+    data = make_pdf(args.pages, args.kind)
+    print(f'{args.pages} {args.kind} pages at {args.dpi} dpi ({len(data) / 1e6:.1f} MB)')
+    for name, fn in BACKENDS.items():
+        r = isolated(fn, data, args.dpi)
+        if 'error' in r:
+            print(f'{name:>8}: skipped ({r["error"]})')
+        else:
+            print(f'{name:>8}: {r["seconds"]:6.2f} s  {r["result"] / r["seconds"]:7.1f} pages/s  peak {r["peak_rss_mb"]:7.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+import multiprocessing as mp
+import resource
+import time
+
+
+def _child(fn, args, q):
+    t = time.perf_counter()
+    try:
+        result = fn(*args)
+    except Exception as e:
+        q.put({'error': f'{type(e).__name__}: {e}'})
+        return
+    seconds = time.perf_counter() - t
+    # children covers subprocesses such as poppler or tesseract
+    rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    q.put({'seconds': seconds, 'peak_rss_mb': rss / 1024, 'result': result})
+
+
+def isolated(fn, *args):
+    """Run module-level ``fn(*args)`` in a fresh process so peak RSS is its own.
+
+    Returns a dict with seconds, peak_rss_mb and fn's (picklable) result, or
+    with an error message if it raised.
+    """
+    ctx = mp.get_context('spawn')
+    q = ctx.Queue()
+    p = ctx.Process(target=_child, args=(fn, args, q))
+    p.start()
+    r = q.get()
+    p.join()
+    return r
@@ -0,0 +1,77 @@
+import io
+import zipfile
+
+import pymupdf as fitz  # PyMuPDF
+from PIL import Image, ImageDraw
+
+LOREM = ('Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor '
+         'incididunt ut labore et dolore magna aliqua. Ut enim ad minim veniam, quis nostrud.')
+
+
+def _scan(n, dpi=150):
+    # a page-sized grayscale bitmap with a few lines of rendered text, like a scanner produces
+    w, h = int(8.5 * dpi), int(11 * dpi)
+    im = Image.new('L', (w, h), 255)
+    d = ImageDraw.Draw(im)
+    for y in range(dpi, h - dpi, dpi // 3):
+        d.text((dpi, y), f'{n} {LOREM[:80]}', fill=0)
+    buf = io.BytesIO()
+    im.save(buf, 'JPEG', quality=80)
+    return buf.getvalue()
+
+
+def make_pdf(pages, kind='text', dpi=150):
+    """Return the bytes of a synthetic PDF: 'text' (born-digital), 'scanned' (one image per page) or 'mixed'."""
+    doc = fitz.open()
+    scans = {}
+    for i in range(pages):
+        page = doc.new_page()
+        scanned = kind == 'scanned' or (kind == 'mixed' and i % 2)
+        if scanned:
+            # a handful of distinct bitmaps, each embedded once and referenced by xref,
+            # keeps generation fast without making every page identical
+            k = i % 7
+            if k in scans:
+                page.insert_image(page.rect, xref=scans[k])
+            else:
+                scans[k] = page.insert_image(page.rect, stream=_scan(k, dpi))
+        else:
+            page.insert_textbox(page.rect + (72, 72, -72, -72), f'Page {i + 1}\n' + LOREM * 12, fontsize=11)
+    data = doc.tobytes(garbage=3, deflate=True)
+    doc.close()
+    return data
+
+
+def make_images(count, dpi=150):
+    """Return (name, JPEG bytes) pairs of scanned-looking pages, for the image-to-PDF path."""
+    return [(f'scan_{i + 1}.jpg', _scan(i, dpi)) for i in range(count)]
+
+
+def make_epub(chapters, paragraphs=200):
+    """Return the bytes of a minimal EPUB 2 book with a table of contents, one XHTML file per chapter."""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as z:
+        z.writestr('mimetype', 'application/epub+zip', compress_type=zipfile.ZIP_STORED)
+        z.writestr('META-INF/container.xml',
+                   '<?xml version="1.0"?><container version="1.0" '
+                   'xmlns="urn:oasis:names:tc:opendocument:xmlns:container"><rootfiles>'
+                   '<rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>'
+                   '</rootfiles></container>')
+        items = ''.join(f'<item id="c{i}" href="c{i}.xhtml" media-type="application/xhtml+xml"/>'
+                        for i in range(chapters))
+        spine = ''.join(f'<itemref idref="c{i}"/>' for i in range(chapters))
+        z.writestr('OEBPS/content.opf',
+                   '<?xml version="1.0"?><package xmlns="http://www.idpf.org/2007/opf" version="2.0" '
+                   'unique-identifier="id"><metadata xmlns:dc="http://purl.org/dc/elements/1.1/">'
+                   '<dc:title>Synthetic</dc:title><dc:creator>Bench</dc:creator><dc:identifier id="id">synth'
+                   f'</dc:identifier></metadata><manifest>{items}<item id="ncx" href="toc.ncx" '
+                   f'media-type="application/x-dtbncx+xml"/></manifest><spine toc="ncx">{spine}</spine></package>')
+        nav = ''.join(f'<navPoint id="n{i}" playOrder="{i + 1}"><navLabel><text>Chapter {i + 1}</text></navLabel>'
+                      f'<content src="c{i}.xhtml"/></navPoint>' for i in range(chapters))
+        z.writestr('OEBPS/toc.ncx', '<?xml version="1.0"?><ncx xmlns="http://www.daisy.org/z3986/2005/ncx/" '
+                   f'version="2005-1"><head/><docTitle><text>Synthetic</text></docTitle><navMap>{nav}</navMap></ncx>')
+        for i in range(chapters):
+            body = ''.join(f'<p>{i + 1}.{j + 1} {LOREM}</p>' for j in range(paragraphs))
+            z.writestr(f'OEBPS/c{i}.xhtml', '<?xml version="1.0"?><html xmlns="http://www.w3.org/1999/xhtml">'
+                       f'<head><title>Chapter {i + 1}</title></head><body><h1>Chapter {i + 1}</h1>{body}</body></html>')
+    return buf.getvalue()
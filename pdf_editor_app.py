@@ -1,17 +1,29 @@
 import streamlit as st
-import PyPDF2
+import functools
 import os
-import io
-import fitz  # PyMuPDF
-from pdf2image import convert_from_path
+import re
+import secrets
+import zipfile
 from PIL import Image
-import pytesseract
-from docx import Document
 import pandas as pd
-import img2pdf
-import tempfile
-import zipfile
-import shutil
+from pdfeditor.batch import OPERATIONS, batch_archive, iter_inputs
+from pdfeditor.compress import PRESETS, CompressReport, can_linearize
+from pdfeditor.doccache import DocCache
+from pdfeditor.ebook import input_formats as ebook_inputs, output_formats as ebook_outputs
+from pdfeditor.images import ExtractReport
+from pdfeditor.jobs import FINISHED, JobQueue
+from pdfeditor.metrics import REGISTRY, collect
+from pdfeditor.ocr import ocr_image, ocr_pages
+from pdfeditor.operations import (
+    add_page_numbers, add_watermark, compress_pdf, convert_ebook, crop_pdf, decrypt_pdf, delete_pages,
+    encrypt_pdf, extract_images, extract_metadata, flatten_pdf, images_to_pdf, index_documents, insert_pages,
+    merge_pdfs, ocr_pdf, pdf_to_docx, pdf_to_images, pdf_to_spreadsheet, rotate_pdf, split_pdf,
+)
+from pdfeditor.pipeline import STEPS, run_pipeline
+from pdfeditor.preflight import route
+from pdfeditor.search import SearchIndex
+from pdfeditor.spool import LARGE_FILE_BYTES
+from pdfeditor.stamp import NUMBER_FORMATS, POSITIONS
 
 
 def show_image_thumbnails(image_files):
@@ -22,16 +34,114 @@ def show_image_thumbnails(image_files):
 
 def show_pdf_thumbnail(pdf_file):
     try:
-        temp_pdf = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-        temp_pdf.write(pdf_file.read())
-        temp_pdf.flush()
-        img = convert_from_path(temp_pdf.name, first_page=1, last_page=1)[0]
-        st.image(img, caption=f"Preview: {pdf_file.name} (Page 1)", use_column_width=True)
-        temp_pdf.close()
-        pdf_file.seek(0)
+        st.image(docs.thumbnail(pdf_file), caption=f"Preview: {pdf_file.name} (Page 1)", use_column_width=True)
     except Exception as e:
         st.warning(f"⚠️ Could not generate PDF preview: {e}")
 
+def editable(f):
+    # large uploads are spooled to disk by the operation rather than held in the document cache
+    if f.size > LARGE_FILE_BYTES:
+        st.caption(f"💾 Large file ({f.size / 2**20:.0f} MB): processing from disk")
+        return f
+    return docs.upload(f)
+
+def watermark_options():
+    kwargs = {}
+    if st.radio("Watermark", ["Text", "Image"], horizontal=True) == "Text":
+        kwargs['text'] = st.text_input("Watermark Text", "Confidential")
+        kwargs['fontsize'] = st.slider("Font size", 8, 144, 48)
+    else:
+        img = st.file_uploader("Watermark Image", type=['png', 'jpg', 'jpeg'])
+        kwargs['image'] = img.getvalue() if img else None
+    c1, c2, c3 = st.columns(3)
+    kwargs['position'] = c1.selectbox("Position", POSITIONS)
+    kwargs['angle'] = c2.slider("Angle", -180, 180, 45)
+    kwargs['opacity'] = c3.slider("Opacity", 0.05, 1.0, 0.3)
+    return kwargs
+
+def number_options():
+    kwargs = {}
+    c1, c2 = st.columns(2)
+    label = c1.selectbox("Format", list(NUMBER_FORMATS) + ["Custom"])
+    kwargs['fmt'] = NUMBER_FORMATS.get(label) or c2.text_input("Template", "{n}", help="Fields: {n}, {total}, {prefix}")
+    if '{prefix' in kwargs['fmt']:
+        kwargs['prefix'] = c2.text_input("Prefix", "ABC")
+    c1, c2, c3 = st.columns(3)
+    kwargs['position'] = c1.selectbox("Position", POSITIONS, index=POSITIONS.index('bottom'))
+    kwargs['start'] = int(c2.number_input("Start at", min_value=0, value=1))
+    kwargs['fontsize'] = c3.slider("Font size", 6, 36, 12)
+    return kwargs
+
+def plan_for(f, op, dpi=None):
+    try:
+        return route(docs.profile(f), op, dpi)
+    except ValueError:
+        return None
+
+def preflight(f, op, dpi=None):
+    # what the operation will do with this file and roughly how long it will take, before it runs;
+    # None when there is no file or it cannot be processed, which also disables the run button
+    if not f:
+        return None
+    plan = plan_for(f, op, dpi)
+    if plan is None:
+        st.warning("🔒 This PDF is password protected: decrypt it first.")
+        return None
+    p = docs.profile(f)
+    s = plan['seconds']
+    eta = "under a second" if s < 1 else f"~{s:.0f} s" if s < 90 else f"~{s / 60:.0f} min"
+    st.caption(f"⏱️ Estimated time: {eta}" + "".join(f" · {n}" for n in plan['notes']))
+    with st.expander("🔎 Pre-flight analysis"):
+        st.dataframe(pd.DataFrame(p.rows()), use_container_width=True, hide_index=True)
+        st.caption(f"Analysed in {p.seconds * 1000:.0f} ms")
+    return plan
+
+def operation_kwargs(name):
+    # option widgets for an operation run through the batch or job runners
+    kwargs = {}
+    if name == "Rotate PDF":
+        kwargs['rotation_angle'] = st.selectbox("Angle", [90, 180, 270])
+    elif name == "Crop PDF":
+        c1, c2, c3, c4 = st.columns(4)
+        kwargs['box'] = (c1.number_input("X0", value=0.0), c2.number_input("Y0", value=0.0),
+                         c3.number_input("X1", value=612.0), c4.number_input("Y1", value=792.0))
+    elif name == "Add Watermark":
+        kwargs = watermark_options()
+    elif name == "Add Page Numbers":
+        kwargs = number_options()
+    elif name == "Compress PDF":
+        kwargs['preset'] = st.selectbox("Preset", list(PRESETS), index=1)
+    elif name in ("Encrypt PDF", "Decrypt PDF"):
+        kwargs['pwd'] = st.text_input("Password", type='password')
+    elif name == "Delete Pages":
+        rng = st.text_input("Pages to delete, e.g. 1,3,5")
+        kwargs['pages'] = [int(x) for x in rng.split(',') if x.strip().isdigit()]
+    return kwargs
+
+@st.cache_resource
+def job_queue():
+    # one queue per server process so jobs outlive reruns and reconnects; each visitor only sees their own
+    return JobQueue()
+
+def owner_token():
+    # a random token in the URL that jobs and indexed documents belong to: reloading or bookmarking the
+    # page keeps them, other visitors never see them
+    if 'owner' not in st.query_params:
+        st.query_params['owner'] = secrets.token_urlsafe(16)
+    return st.query_params['owner']
+
+HIT_MARK = ('\x02', '\x03')  # control characters, which the index strips from page text
+
+def highlight(snippet):
+    # document text is escaped so that its *, _, # or [..](..) show as typed; only the hits become bold
+    text = re.sub(r'([\\`*_{}\[\]()<>#+\-.!|~$:])', r'\\\1', snippet)
+    return text.replace(HIT_MARK[0], '**').replace(HIT_MARK[1], '**')
+
+@st.cache_resource
+def search_index():
+    # one index per server process; each visitor only searches the documents they indexed
+    return SearchIndex()
+
 # ------------------ PAGE SETTINGS -------------------
 st.set_page_config(page_title="Dev's PDF Editor", layout="wide")
 col1, col2 = st.columns([1, 8])
@@ -42,290 +152,12 @@ with col2:
 
 st.markdown("Upload PDF files or images and select an operation to manipulate your files.")
 
-# ------------------ FUNCTIONS -------------------
-def convert_ebook(input_file, output_format):
-    # API configuration
-    API_BASE_URL = "https://ebook-converter-api.onrender.com"
-    
-    try:
-        # Prepare the file for upload
-        files = {
-            'file': (input_file.name, input_file.getvalue(), input_file.type)
-        }
-        data = {
-            'output_format': output_format
-        }
-
-        # Make the request
-        response = requests.post(
-            f"{API_BASE_URL}/convert",
-            files=files,
-            data=data,
-            timeout=30  # 30 seconds timeout
-        )
-
-        # Check for successful response
-        response.raise_for_status()  # This will raise an exception for 4XX/5XX status codes
-
-        # Check if we got a valid file back
-        if not response.content:
-            raise ValueError("Received empty response from API")
-
-        # Check content type to verify it's a file
-        content_type = response.headers.get('content-type', '')
-        if 'application/json' in content_type:
-            # Might be an error message in JSON format
-            error_data = response.json()
-            raise ValueError(f"API error: {error_data.get('detail', 'Unknown error')}")
-
-        return response.content
-
-    except requests.exceptions.RequestException as e:
-        raise Exception(f"API request failed: {str(e)}")
-    except Exception as e:
-        raise Exception(f"Conversion failed: {str(e)}")
-def merge_pdfs(uploaded_files):
-    merger = PyPDF2.PdfMerger()
-    for file in uploaded_files:
-        merger.append(file)
-    output = io.BytesIO()
-    merger.write(output)
-    merger.close()
-    output.seek(0)
-    return output
-
-def split_pdf(uploaded_file, page_ranges):
-    reader = PyPDF2.PdfReader(uploaded_file)
-    output_files = []
-    for rng in page_ranges.split(','):
-        start, end = map(int, rng.split('-'))
-        writer = PyPDF2.PdfWriter()
-        for i in range(start-1, end):
-            writer.add_page(reader.pages[i])
-        buf = io.BytesIO()
-        writer.write(buf)
-        buf.seek(0)
-        output_files.append(buf)
-    return output_files
-
-def rotate_pdf(uploaded_file, rotation_angle):
-    reader = PyPDF2.PdfReader(uploaded_file)
-    writer = PyPDF2.PdfWriter()
-    for page in reader.pages:
-        page.rotate(rotation_angle)
-        writer.add_page(page)
-    buf = io.BytesIO()
-    writer.write(buf)
-    buf.seek(0)
-    return buf
-
-def images_to_pdf(image_files):
-    with tempfile.TemporaryDirectory() as tmp:
-        paths = []
-        for img in image_files:
-            p = os.path.join(tmp, img.name)
-            with open(p, 'wb') as f:
-                f.write(img.read())
-            paths.append(p)
-        out = io.BytesIO()
-        out.write(img2pdf.convert(paths, rotation=img2pdf.Rotation.ifvalid))
-        out.seek(0)
-        return out
-#def images_to_pdf(image_files):
-#    with tempfile.TemporaryDirectory() as tmp:
-#        paths = []
-#        for img in image_files:
-#            p = os.path.join(tmp, img.name)
-#            with open(p, 'wb') as f:
-#                f.write(img.read())
-#            paths.append(p)
-#        out = io.BytesIO()
-#        out.write(img2pdf.convert(paths))
-#        out.seek(0)
-#        return out
-
-def pdf_to_images(uploaded_file):
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-    tmp.write(uploaded_file.read())
-    tmp.close()
-    imgs = convert_from_path(tmp.name)
-    os.unlink(tmp.name)
-    outs = []
-    for i, im in enumerate(imgs, 1):
-        buf = io.BytesIO()
-        im.save(buf, 'PNG')
-        buf.seek(0)
-        outs.append((f'page_{i}.png', buf))
-    return outs
-
-def crop_pdf(uploaded_file, box):
-    doc = fitz.open(stream=uploaded_file.read(), filetype='pdf')
-    for p in doc:
-        p.set_cropbox(fitz.Rect(*box))
-    buf = io.BytesIO()
-    doc.save(buf)
-    doc.close()
-    buf.seek(0)
-    return buf
-
-def ocr_pdf(uploaded_file):
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-    tmp.write(uploaded_file.read())
-    tmp.close()
-    imgs = convert_from_path(tmp.name)
-    os.unlink(tmp.name)
-    text = ''.join(pytesseract.image_to_string(i) + '\n' for i in imgs)
-    buf = io.BytesIO()
-    buf.write(text.encode())
-    buf.seek(0)
-    return buf
-
-def pdf_to_docx(uploaded_file):
-    doc = Document()
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-    tmp.write(uploaded_file.read())
-    tmp.close()
-    imgs = convert_from_path(tmp.name)
-    os.unlink(tmp.name)
-    for im in imgs:
-        doc.add_paragraph(pytesseract.image_to_string(im))
-    buf = io.BytesIO()
-    doc.save(buf)
-    buf.seek(0)
-    return buf
-
-def pdf_to_spreadsheet(uploaded_file):
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-    tmp.write(uploaded_file.read())
-    tmp.close()
-    imgs = convert_from_path(tmp.name)
-    os.unlink(tmp.name)
-    data = []
-    for im in imgs:
-        for ln in pytesseract.image_to_string(im).splitlines():
-            if ln.strip():
-                data.append(ln.split())
-    df = pd.DataFrame(data)
-    buf = io.BytesIO()
-    df.to_excel(buf, index=False)
-    buf.seek(0)
-    return buf
-
-def add_watermark(uploaded_file, text):
-    doc = fitz.open(stream=uploaded_file.read(), filetype='pdf')
-    for p in doc:
-        p.insert_text((50, 50), text, fontsize=20, color=(0.5, 0.5, 0.5), rotate=45)
-    buf = io.BytesIO()
-    doc.save(buf)
-    doc.close()
-    buf.seek(0)
-    return buf
-
-def compress_pdf(uploaded_file):
-    doc = fitz.open(stream=uploaded_file.read(), filetype='pdf')
-    buf = io.BytesIO()
-    doc.save(buf, deflate=True)
-    doc.close()
-    buf.seek(0)
-    return buf
-
-def extract_metadata(uploaded_file):
-    md = PyPDF2.PdfReader(uploaded_file).metadata
-    txt = '\n'.join(f"{k}: {v}" for k, v in md.items())
-    buf = io.BytesIO()
-    buf.write(txt.encode())
-    buf.seek(0)
-    return buf
-
-# Advanced features
-def encrypt_pdf(uploaded_file, pwd):
-    rdr = PyPDF2.PdfReader(uploaded_file)
-    w = PyPDF2.PdfWriter()
-    for pg in rdr.pages:
-        w.add_page(pg)
-    w.encrypt(pwd)
-    buf = io.BytesIO()
-    w.write(buf)
-    buf.seek(0)
-    return buf
-
-def decrypt_pdf(uploaded_file, pwd):
-    rdr = PyPDF2.PdfReader(uploaded_file)
-    if rdr.is_encrypted:
-        rdr.decrypt(pwd)
-    w = PyPDF2.PdfWriter()
-    for pg in rdr.pages:
-        w.add_page(pg)
-    buf = io.BytesIO()
-    w.write(buf)
-    buf.seek(0)
-    return buf
-
-def delete_pages(uploaded_file, pages):
-    rdr = PyPDF2.PdfReader(uploaded_file)
-    w = PyPDF2.PdfWriter()
-    for i, pg in enumerate(rdr.pages, 1):
-        if i not in pages:
-            w.add_page(pg)
-    buf = io.BytesIO()
-    w.write(buf)
-    buf.seek(0)
-    return buf
-
-def insert_pages(base, ins, pos):
-    br = PyPDF2.PdfReader(base)
-    ir = PyPDF2.PdfReader(ins)
-    w = PyPDF2.PdfWriter()
-    for i in range(pos):
-        w.add_page(br.pages[i])
-    for pg in ir.pages:
-        w.add_page(pg)
-    for i in range(pos, len(br.pages)):
-        w.add_page(br.pages[i])
-    buf = io.BytesIO()
-    w.write(buf)
-    buf.seek(0)
-    return buf
-
-def extract_images(uploaded_file):
-    doc = fitz.open(stream=uploaded_file.read(), filetype='pdf')
-    imgs = []
-    for p in range(len(doc)):
-        for img in doc.get_page_images(p):
-            xref = img[0]
-            pix = fitz.Pixmap(doc, xref)
-            imgs.append((f'p{p+1}_x{xref}.png', pix.tobytes('png')))
-    out = io.BytesIO()
-    z = zipfile.ZipFile(out, 'w')
-    for n, b in imgs:
-        z.writestr(n, b)
-    z.close()
-    out.seek(0)
-    return out
-
-def add_page_numbers(uploaded_file):
-    doc = fitz.open(stream=uploaded_file.read(), filetype='pdf')
-    for i, p in enumerate(doc, 1):
-        p.insert_text((72, 20), str(i), fontsize=12)
-    buf = io.BytesIO()
-    doc.save(buf)
-    doc.close()
-    buf.seek(0)
-    return buf
-
-def flatten_pdf(uploaded_file):
-    doc = fitz.open(stream=uploaded_file.read(), filetype='pdf')
-    for p in doc:
-        p.flatten_annotations()
-    buf = io.BytesIO()
-    doc.save(buf)
-    doc.close()
-    buf.seek(0)
-    return buf
-
 # ------------------ SIDEBAR & MENU -------------------
 if 'operation' not in st.session_state:
     st.session_state.operation = None
+if 'docs' not in st.session_state:
+    st.session_state.docs = DocCache()
+docs = st.session_state.docs
 
 st.sidebar.title("📑 Menu")
 if st.session_state.operation is None:
@@ -355,6 +187,8 @@ if st.session_state.operation is None:
             st.session_state.operation = "Add Watermark"
         if st.sidebar.button("Compress PDF", key="s_compress"):
             st.session_state.operation = "Compress PDF"
+        if st.sidebar.button("Pipeline", key="s_pipeline"):
+            st.session_state.operation = "Pipeline"
     with st.sidebar.expander("🔒 Security"):
         if st.sidebar.button("Encrypt PDF", key="s_enc"):
             st.session_state.operation = "Encrypt PDF"
@@ -377,9 +211,23 @@ if st.session_state.operation is None:
             st.session_state.operation = "OCR PDF to Text"
         if st.sidebar.button("Extract Metadata", key="s_meta"):
             st.session_state.operation = "Extract Metadata"
+        if st.sidebar.button("Search Documents", key="s_search"):
+            st.session_state.operation = "Search Documents"
+    with st.sidebar.expander("📦 Batch"):
+        if st.sidebar.button("Batch Process", key="s_batch"):
+            st.session_state.operation = "Batch Process"
+        if st.sidebar.button("Background Jobs", key="s_jobs"):
+            st.session_state.operation = "Background Jobs"
 else:
     if st.sidebar.button("⬅️ Back to Menu", key="s_back"):
         st.session_state.operation = None
+cs = docs.stats()
+if cs['hits'] + cs['misses']:
+    st.sidebar.caption(f"Document cache: {cs['entries']} files, {cs['bytes'] / 2**20:.0f} MB, "
+                       f"{cs['hit_rate']:.0%} hit rate")
+
+diagnostics = st.sidebar.toggle("🩺 Diagnostics")
+traces = collect(diagnostics, diagnostics and st.sidebar.checkbox("Profile operations (cProfile)"))
 
 # ------------------ MAIN UI -------------------
 op = st.session_state.operation
@@ -389,8 +237,9 @@ else:
     st.subheader(f"▶️ Current Operation: {op}")
     # Basic operations
     if op == "Convert Ebook":
-        f = st.file_uploader("Upload ebook file", type=['pdf', 'epub', 'mobi', 'azw3', 'docx', 'html', 'txt'])
-        out_format = st.selectbox("Output format", ['epub', 'pdf', 'mobi', 'azw3', 'docx', 'htmlz', 'txt'])
+        f = st.file_uploader("Upload ebook file", type=ebook_inputs())
+        formats = ebook_outputs()
+        out_format = st.selectbox("Output format", formats, index=formats.index('pdf'))
         if st.button("Convert") and f:
             try:
                 converted_data = convert_ebook(f, out_format)
@@ -406,27 +255,41 @@ else:
             st.download_button("Download PDF", data=out, file_name='images.pdf')
     elif op == "PDF to Images":
         f = st.file_uploader("Upload PDF", type='pdf')
-        if st.button("Convert PDF to Images") and f:
-            outs = pdf_to_images(f)
-            buf = io.BytesIO()
-            with zipfile.ZipFile(buf, 'w') as z:
-                for n, b in outs:
-                    z.writestr(n, b.getvalue())
-            buf.seek(0)
+        suggested = (plan_for(f, op) or {}).get('dpi', 200) if f else 200
+        dpi = int(st.number_input("DPI", min_value=36, max_value=600, value=suggested))
+        plan = preflight(f, op, dpi)
+        if st.button("Convert PDF to Images", disabled=plan is None) and plan:
+            out = pdf_to_images(docs.document(f), dpi)
             st.success("✅ Converted!")
-            st.download_button("Download ZIP", data=buf, file_name='pages.zip')
+            st.download_button("Download ZIP", data=out.read(), file_name='pages.zip')
     elif op == "PDF to DOCX":
         f = st.file_uploader("Upload PDF", type='pdf')
-        if st.button("Convert to DOCX") and f:
-            out = pdf_to_docx(f)
+        plan = preflight(f, op)
+        if st.button("Convert to DOCX", disabled=plan is None) and plan:
+            out = pdf_to_docx(docs.document(f))
             st.success("✅ Converted!")
             st.download_button("Download DOCX", data=out, file_name='out.docx')
     elif op == "PDF to Spreadsheet":
         f = st.file_uploader("Upload PDF", type='pdf')
-        if st.button("Convert to XLSX") and f:
-            out = pdf_to_spreadsheet(f)
-            st.success("✅ Converted!")
-            st.download_button("Download XLSX", data=out, file_name='out.xlsx')
+        plan = preflight(f, op)
+        if st.button("Convert to XLSX", disabled=plan is None) and plan:
+            try:
+                out = pdf_to_spreadsheet(docs.document(f))
+                st.success("✅ Converted!")
+                st.download_button("Download XLSX", data=out, file_name='out.xlsx')
+            except RuntimeError as e:
+                st.error(f"❌ {e}")
+    elif op == "OCR PDF to Text":
+        f = st.file_uploader("Upload PDF", type='pdf')
+        plan = preflight(f, op)
+        if st.button("Extract Text", disabled=plan is None) and plan:
+            bar = st.progress(0.0)
+            try:
+                out = ocr_pdf(docs.document(f), lambda i, n: bar.progress(i / n, text=f"page {i} / {n}"))
+                st.success("✅ Text extracted!")
+                st.download_button("Download", data=out, file_name='text.txt')
+            except RuntimeError as e:
+                st.error(f"❌ {e}")
     elif op == "Merge PDFs":
         fs = st.file_uploader("Upload PDFs", accept_multiple_files=True, type='pdf')
         if st.button("Merge PDFs") and fs:
@@ -435,17 +298,22 @@ else:
             st.download_button("Download", data=out, file_name='merged.pdf')
     elif op == "Split PDF":
         f = st.file_uploader("Upload PDF", type='pdf')
+        if f:
+            st.caption(f"📄 {docs.page_count(f)} pages")
         rng = st.text_input("Ranges e.g. 1-3,5-7")
         if st.button("Split PDF") and f and rng:
-            ofs = split_pdf(f, rng)
-            st.success("✅ Split!")
-            for i, b in enumerate(ofs, 1):
-                st.download_button(f"Part {i}", data=b, file_name=f'part{i}.pdf')
+            try:
+                ofs = split_pdf(docs.document(f), rng)
+                st.success("✅ Split!")
+                for i, b in enumerate(ofs, 1):
+                    st.download_button(f"Part {i}", data=b, file_name=f'part{i}.pdf')
+            except ValueError as e:
+                st.error(f"❌ {e}")
     elif op == "Rotate PDF":
         f = st.file_uploader("Upload PDF", type='pdf')
         ang = st.selectbox("Angle", [90, 180, 270])
         if st.button("Rotate PDF") and f:
-            out = rotate_pdf(f, ang)
+            out = rotate_pdf(editable(f), ang)
             st.success("✅ Rotated!")
             st.download_button("Download", data=out, file_name='rotated.pdf')
     elif op == "Crop PDF":
@@ -456,28 +324,118 @@ else:
         x1 = c3.number_input("X1", value=612.0)
         y1 = c4.number_input("Y1", value=792.0)
         if st.button("Crop PDF") and f:
-            out = crop_pdf(f, (x0, y0, x1, y1))
+            out = crop_pdf(editable(f), (x0, y0, x1, y1))
             st.success("✅ Cropped!")
             st.download_button("Download", data=out, file_name='cropped.pdf')
     elif op == "Add Watermark":
         f = st.file_uploader("Upload PDF", type='pdf')
-        txt = st.text_input("Watermark Text", "Confidential")
+        opts = watermark_options()
         if st.button("Add Watermark") and f:
-            out = add_watermark(f, txt)
+            out = add_watermark(editable(f), **opts)
             st.success("✅ Watermarked!")
             st.download_button("Download", data=out, file_name='wm.pdf')
     elif op == "Compress PDF":
         f = st.file_uploader("Upload PDF", type='pdf')
-        if st.button("Compress PDF") and f:
-            out = compress_pdf(f)
-            st.success("✅ Compressed!")
+        mode = st.radio("Mode", ["Preset", "Target size"], horizontal=True)
+        if mode == "Preset":
+            preset = st.selectbox("Preset", list(PRESETS), index=1)
+            target = None
+        else:
+            preset = None
+            target = int(st.number_input("Target size (KB)", min_value=10, value=1024) * 1024)
+        linearize = st.checkbox("Linearize (fast web view)", disabled=not can_linearize(),
+                                help=None if can_linearize() else "Not supported by the installed PyMuPDF")
+        plan = preflight(f, op)
+        if st.button("Compress PDF", disabled=plan is None) and plan:
+            report = CompressReport()
+            out = compress_pdf(docs.upload(f), preset, target, linearize, report)
+            st.success(f"✅ Compressed to {out.getbuffer().nbytes / 1024:.0f} KB in {report.seconds:.1f} s!")
+            for w in report.warnings:
+                st.warning(f"⚠️ {w}")
+            st.caption(f"{report.images_recompressed} images recompressed, {report.images_skipped} kept · settings {report.settings}")
+            st.dataframe(pd.DataFrame(report.rows()), use_container_width=True)
             st.download_button("Download", data=out, file_name='compressed.pdf')
+    elif op == "Pipeline":
+        f = st.file_uploader("Upload PDF", type='pdf')
+        if 'pipeline' not in st.session_state:
+            st.session_state.pipeline = []
+        c1, c2 = st.columns([1, 2])
+        step = c1.selectbox("Step", list(STEPS), format_func=lambda k: STEPS[k][0])
+        kwargs = {}
+        with c2:
+            if step == 'rotate':
+                kwargs['angle'] = st.selectbox("Angle", [90, 180, 270])
+            elif step == 'delete_pages':
+                rng = st.text_input("Pages to delete, e.g. 1,3,5")
+                kwargs['pages'] = [int(x) for x in rng.split(',') if x.strip().isdigit()]
+            elif step == 'crop':
+                b1, b2, b3, b4 = st.columns(4)
+                kwargs['box'] = (b1.number_input("X0", value=0.0), b2.number_input("Y0", value=0.0),
+                                 b3.number_input("X1", value=612.0), b4.number_input("Y1", value=792.0))
+            elif step == 'watermark':
+                kwargs = watermark_options()
+            elif step == 'page_numbers':
+                kwargs = number_options()
+        if st.button("➕ Add Step"):
+            st.session_state.pipeline.append((step, kwargs))
+        for i, (name, kw) in enumerate(st.session_state.pipeline):
+            a, b = st.columns([8, 1])
+            a.write(f"{i + 1}. {STEPS[name][0]} " + ", ".join(
+                f"{k}={'<image>' if isinstance(v, bytes) else v}" for k, v in kw.items()))
+            if b.button("✖", key=f"pl_rm{i}"):
+                st.session_state.pipeline.pop(i)
+                st.rerun()
+        if st.button("Run Pipeline") and f and st.session_state.pipeline:
+            out = run_pipeline(editable(f), st.session_state.pipeline)
+            st.success(f"✅ Applied {len(st.session_state.pipeline)} steps!")
+            st.download_button("Download", data=out, file_name='pipeline.pdf')
     elif op == "Extract Metadata":
         f = st.file_uploader("Upload PDF", type='pdf')
         if st.button("Extract Metadata") and f:
             out = extract_metadata(f)
             st.success("✅ Metadata!")
             st.download_button("Download", data=out, file_name='metadata.txt')
+    elif op == "Search Documents":
+        index = search_index()
+        owner = owner_token()
+        st.warning("🔑 Uploaded PDFs are indexed on the server. Their text stays searchable from this page's link "
+                   "only, until you forget it below.")
+        fs = st.file_uploader("Upload PDFs to index", type='pdf', accept_multiple_files=True)
+        # uploads already indexed in this session, by Streamlit file_id, so reruns (every keystroke in the
+        # search box) neither reread nor rehash them
+        indexed = st.session_state.setdefault('indexed', {})
+        todo = [f for f in fs or [] if f.file_id not in indexed]
+        if todo:
+            bar = st.progress(0.0)
+            results = index_documents(todo, index, lambda i, n: bar.progress(i / n, text=f"Indexed {i} / {n} files"),
+                                      owner=owner)
+            bar.empty()
+            indexed.update((f.file_id, r) for f, r in zip(todo, results))
+            new = [r['file'] for r in results if r['new']]
+            if new:
+                st.success(f"✅ Indexed {len(new)} new file(s): {', '.join(new)}")
+        for f in fs or []:
+            if indexed[f.file_id]['error']:
+                st.warning(f"⚠️ {f.name} was not indexed: {indexed[f.file_id]['error']}")
+        s = index.stats(owner)
+        a, b = st.columns([4, 1])
+        a.caption(f"{s['documents']} documents, {s['pages']} pages indexed")
+        if s['documents'] and b.button("🗑️ Forget my documents"):
+            index.clear(owner)
+            indexed.clear()
+            st.rerun()
+        query = st.text_input("Search", placeholder="All words must match; end a word with * to match a prefix")
+        if query:
+            hits = index.search(query, owner, mark=HIT_MARK)
+            if not hits:
+                st.info("No matches.")
+            by_doc = {}
+            for h in hits:
+                by_doc.setdefault(h['name'], []).append(h)
+            for name, doc_hits in by_doc.items():
+                with st.expander(f"📄 {name} — {len(doc_hits)} page(s)", expanded=True):
+                    for h in doc_hits:
+                        st.markdown(f"**p. {h['page']}** · " + highlight(' '.join(h['snippet'].split())))
     # Advanced
     elif op == "Encrypt PDF":
         f = st.file_uploader("Upload PDF to Encrypt", type='pdf')
@@ -490,16 +448,21 @@ else:
         f = st.file_uploader("Upload Encrypted PDF", type='pdf')
         pwd = st.text_input("Password", type='password')
         if st.button("Decrypt PDF") and f and pwd:
-            out = decrypt_pdf(f, pwd)
-            st.success("✅ Decrypted!")
-            st.download_button("Download", data=out, file_name='decrypted.pdf')
+            try:
+                out = decrypt_pdf(f, pwd)
+                st.success("✅ Decrypted!")
+                st.download_button("Download", data=out, file_name='decrypted.pdf')
+            except ValueError as e:
+                st.error(f"❌ {e}")
     elif op == "Delete Pages":
         f = st.file_uploader("Upload PDF", type='pdf')
+        if f:
+            st.caption(f"📄 {docs.page_count(f)} pages")
         rng = st.text_input("Pages to delete, e.g. 1,3,5")
         if st.button("Delete Pages") and f and rng:
             try:
                 pages = [int(x) for x in rng.split(',')]
-                out = delete_pages(f, pages)
+                out = delete_pages(docs.upload(f), pages)
                 st.success("✅ Pages deleted!")
                 st.download_button("Download", data=out, file_name='deleted.pdf')
             except:
@@ -509,27 +472,95 @@ else:
         ins = st.file_uploader("Upload PDF to Insert", type='pdf')
         pos = st.number_input("Position (0-based)", min_value=0, step=1)
         if st.button("Insert Pages") and base and ins:
-            out = insert_pages(base, ins, pos)
+            out = insert_pages(docs.upload(base), docs.document(ins), pos)
             st.success("✅ Pages inserted!")
             st.download_button("Download", data=out, file_name='inserted.pdf')
     elif op == "Extract Images":
         f = st.file_uploader("Upload PDF", type='pdf')
+        dedupe = st.checkbox("Skip images repeated across pages", value=True)
         if st.button("Extract Images") and f:
-            out = extract_images(f)
-            st.success("✅ Images extracted!")
-            st.download_button("Download ZIP", data=out, file_name='images.zip')
+            report = ExtractReport()
+            out = extract_images(docs.document(f), dedupe, report)
+            st.success(f"✅ {len(report.images)} images extracted in {report.total_seconds:.2f} s!")
+            if report.duplicates:
+                st.caption(f"{report.duplicates} repeated images skipped, {report.bytes_saved / 1024:.0f} KB saved")
+            st.dataframe(pd.DataFrame(report.images), use_container_width=True)
+            st.download_button("Download ZIP", data=out.read(), file_name='images.zip')
     elif op == "Add Page Numbers":
         f = st.file_uploader("Upload PDF", type='pdf')
+        opts = number_options()
         if st.button("Add Page Numbers") and f:
-            out = add_page_numbers(f)
-            st.success("✅ Page numbers added!")
-            st.download_button("Download", data=out, file_name='pgnums.pdf')
+            try:
+                out = add_page_numbers(editable(f), **opts)
+                st.success("✅ Page numbers added!")
+                st.download_button("Download", data=out, file_name='pgnums.pdf')
+            except ValueError as e:
+                st.error(f"❌ {e}")
     elif op == "Flatten PDF":
         f = st.file_uploader("Upload PDF to Flatten", type='pdf')
         if st.button("Flatten PDF") and f:
-            out = flatten_pdf(f)
+            out = flatten_pdf(editable(f))
             st.success("✅ PDF flattened!")
             st.download_button("Download", data=out, file_name='flattened.pdf')
+    elif op == "Batch Process":
+        fs = st.file_uploader("Upload PDFs or ZIP archives of PDFs", accept_multiple_files=True, type=['pdf', 'zip'])
+        bop = st.selectbox("Operation", list(OPERATIONS))
+        kwargs = operation_kwargs(bop)
+        workers = st.slider("Parallel workers", 1, max(2, os.cpu_count() or 1), os.cpu_count() or 1)
+        if st.button("Run Batch") and fs:
+            total = 0
+            for f in fs:
+                if f.name.lower().endswith('.zip'):
+                    total += sum(n.lower().endswith('.pdf') for n in zipfile.ZipFile(f).namelist())
+                    f.seek(0)
+                else:
+                    total += 1
+            progress = st.progress(0.0, text=f"0 / {total} files")
+            table = st.empty()
+            rows = []
+
+            def on_result(r):
+                rows.append(r)
+                progress.progress(min(1.0, len(rows) / max(total, 1)), text=f"{len(rows)} / {total} files")
+                table.dataframe(pd.DataFrame(rows), use_container_width=True)
+
+            out, report = batch_archive(iter_inputs(fs), bop, workers, on_result, **kwargs)
+            failed = [r for r in report if not r['ok']]
+            if failed:
+                st.warning(f"⚠️ {len(failed)} of {len(report)} files failed — see report.csv in the archive.")
+            else:
+                st.success(f"✅ Processed {len(report)} files!")
+            st.download_button("Download ZIP", data=out.read(), file_name='batch.zip')
+    elif op == "Background Jobs":
+        jobs = job_queue()
+        owner = owner_token()
+        st.caption(f"🔑 Jobs are private to this page's link and deleted {jobs.retention / 3600:.0f} h after they finish.")
+        f = st.file_uploader("Upload PDF", type='pdf')
+        jop = st.selectbox("Operation", list(OPERATIONS), index=list(OPERATIONS).index("OCR PDF to Text"))
+        kwargs = operation_kwargs(jop)
+        if st.button("Submit Job") and f:
+            jobs.submit(owner, jop, f.name, f.getvalue(), **kwargs)
+            st.success("✅ Job queued!")
+        st.button("🔄 Refresh")
+        for job in jobs.list(owner):
+            a, b, c = st.columns([4, 3, 2])
+            a.write(f"**{job['file']}** · {job['op']}")
+            if job['status'] == 'running' and job['total']:
+                b.progress(job['done'] / job['total'], text=f"page {job['done']} / {job['total']}")
+            else:
+                b.write(job['status'] + (f": {job['error']}" if job['error'] else ""))
+            if job['status'] == 'done':
+                # read from disk only when the button is clicked, not on every rerun
+                c.download_button("Download", data=functools.partial(jobs.read, job['id'], owner),
+                                  file_name=os.path.basename(job['result']).split('_', 1)[1], key=f"job_dl_{job['id']}")
+            elif job['cancellable']:
+                if c.button("Cancel", key=f"job_cancel_{job['id']}"):
+                    jobs.cancel(job['id'], owner)
+                    st.rerun()
+            elif job['status'] in FINISHED:
+                if c.button("Remove", key=f"job_rm_{job['id']}"):
+                    jobs.remove(job['id'], owner)
+                    st.rerun()
     elif op == "OCR Image to Text":
         files = st.file_uploader("Upload Image(s) or PDF(s)", type=['png', 'jpg', 'jpeg', 'pdf'], accept_multiple_files=True)
         if files and st.button("Extract Text"):
@@ -537,22 +568,32 @@ else:
             	st.subheader(f"📄 Text from {f.name}:")
             	if f.type == "application/pdf":
                 	# Convert PDF pages to images and extract text
-                	tmp = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-                	tmp.write(f.read())
-                	tmp.close()
-                	images = convert_from_path(tmp.name)
-                	os.unlink(tmp.name)
-                	text = ""
-                	for img in images:
-                    		text += pytesseract.image_to_string(img) + "\n"
+                	text = "".join(t + "\n" for _, t in ocr_pages(f))
                 	st.text_area(label="", value=text.strip(), height=250)
             	else:
                 	# Image file
                 	image = Image.open(f)
-                	text = pytesseract.image_to_string(image)
+                	text = ocr_image(image)
                 	st.text_area(label="", value=text.strip(), height=250)
        
 
+# ------------------ DIAGNOSTICS -------------------
+if diagnostics:
+    st.markdown("---")
+    st.subheader("🩺 Diagnostics")
+    st.session_state.traces = (st.session_state.get('traces', []) + traces)[-20:]
+    if not st.session_state.traces:
+        st.caption("Run an operation to see where its time and memory went.")
+    for t in reversed(st.session_state.traces):
+        d = t.as_dict()
+        with st.expander(f"{t.op}: {t.seconds:.2f} s, peak RSS {d['rss_peak_mb']:.0f} MB" + (f" ❌ {t.error}" if t.error else "")):
+            st.dataframe(pd.DataFrame([{'stage': k, **v} for k, v in d['stages'].items()]), use_container_width=True)
+            if t.profile:
+                st.code(t.profile)
+    c1, c2 = st.columns(2)
+    c1.download_button("Prometheus metrics", data=REGISTRY.prometheus(), file_name='pdfeditor.prom')
+    c2.download_button("JSON log", data=REGISTRY.json(), file_name='pdfeditor-metrics.json')
+
 # ------------------ FOOTER -------------------
 st.markdown("---")
 st.markdown("Dev's PDF Editor | Code on https://github.com/mahadevbk/pdfeditor ")
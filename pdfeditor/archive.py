@@ -0,0 +1,21 @@
+import tempfile
+import zipfile
+
+from pdfeditor.metrics import stage
+
+SPOOL_BYTES = 32 * 1024 * 1024  # archives larger than this spill to a temp file
+
+
+def spooled_zip(entries, max_size=SPOOL_BYTES, compression=zipfile.ZIP_STORED):
+    """Write (name, bytes) entries into a ZIP as they are produced and return it rewound.
+
+    Only one entry is held in memory at a time; the archive itself stays in
+    RAM up to ``max_size`` and moves to disk beyond that.
+    """
+    out = tempfile.SpooledTemporaryFile(max_size=max_size)
+    with zipfile.ZipFile(out, 'w', compression) as z:
+        for name, data in entries:
+            with stage('save'):
+                z.writestr(name, data)
+    out.seek(0)
+    return out
@@ -0,0 +1,123 @@
+import csv
+import io
+import os
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from pdfeditor import operations as ops
+from pdfeditor.archive import spooled_zip
+from pdfeditor.spool import NamedBytesIO
+
+# operation name -> (function, output extension); each takes an uploaded file first
+OPERATIONS = {
+    'Rotate PDF': (ops.rotate_pdf, '.pdf'),
+    'Crop PDF': (ops.crop_pdf, '.pdf'),
+    'Add Watermark': (ops.add_watermark, '.pdf'),
+    'Compress PDF': (ops.compress_pdf, '.pdf'),
+    'Add Page Numbers': (ops.add_page_numbers, '.pdf'),
+    'Flatten PDF': (ops.flatten_pdf, '.pdf'),
+    'Delete Pages': (ops.delete_pages, '.pdf'),
+    'Encrypt PDF': (ops.encrypt_pdf, '.pdf'),
+    'Decrypt PDF': (ops.decrypt_pdf, '.pdf'),
+    'OCR PDF to Text': (ops.ocr_pdf, '.txt'),
+    'PDF to DOCX': (ops.pdf_to_docx, '.docx'),
+    'PDF to Spreadsheet': (ops.pdf_to_spreadsheet, '.xlsx'),
+    'PDF to Images': (ops.pdf_to_images, '.zip'),
+    'Extract Images': (ops.extract_images, '.zip'),
+    'Extract Metadata': (ops.extract_metadata, '.txt'),
+}
+
+
+def iter_inputs(uploads):
+    """Yield (name, bytes) for every PDF among uploads, expanding ZIP archives one member at a time."""
+    for f in uploads:
+        if f.name.lower().endswith('.zip'):
+            with zipfile.ZipFile(f) as z:
+                for info in z.infolist():
+                    if not info.is_dir() and info.filename.lower().endswith('.pdf'):
+                        yield info.filename, z.read(info)
+        else:
+            yield f.name, f.read()
+
+
+def output_bytes(out):
+    if isinstance(out, (bytes, bytearray)):
+        return bytes(out)
+    if isinstance(out, io.BytesIO):
+        return out.getvalue()
+    out.seek(0)
+    return out.read()
+
+
+def _init():
+    # files already run in parallel across these processes; an operation starting its own pool in each
+    # would run workers x cores processes
+    ops.CPUS = 1
+
+
+def run_one(op, name, data, kwargs):
+    func, _ = OPERATIONS[op]
+    t = time.perf_counter()
+    out = output_bytes(func(NamedBytesIO(data, name), **kwargs))
+    return out, time.perf_counter() - t
+
+
+def _outcome(name, result):
+    try:
+        out, seconds = result()
+    except Exception as e:
+        return {'file': name, 'ok': False, 'data': None, 'seconds': 0.0, 'error': f'{type(e).__name__}: {e}'}
+    return {'file': name, 'ok': True, 'data': out, 'seconds': seconds, 'error': ''}
+
+
+def run_batch(inputs, op, workers=None, **kwargs):
+    """Run operation ``op`` over (name, bytes) inputs on a process pool and yield one result dict per
+    file as it finishes. At most ``workers`` files are in flight, so inputs are read lazily; a single
+    worker runs in-process without starting a pool."""
+    workers = workers or os.cpu_count()
+    if workers == 1:
+        for name, data in inputs:
+            yield _outcome(name, lambda: run_one(op, name, data, kwargs))
+        return
+    inputs = iter(inputs)
+    with ProcessPoolExecutor(workers, initializer=_init) as ex:
+        running = {}
+        while True:
+            for name, data in inputs:
+                running[ex.submit(run_one, op, name, data, kwargs)] = name
+                if len(running) >= workers:
+                    break
+            if not running:
+                return
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                yield _outcome(running.pop(fut), fut.result)
+
+
+def output_name(name, op):
+    return os.path.splitext(name)[0] + OPERATIONS[op][1]
+
+
+def batch_archive(inputs, op, workers=None, on_result=None, **kwargs):
+    """Stream every successful output into one spooled ZIP, plus report.csv listing each file's status.
+
+    ``on_result`` is called with each result as it completes (without its data), for live progress.
+    """
+    report = []
+
+    def entries():
+        for r in run_batch(inputs, op, workers, **kwargs):
+            data = r.pop('data')
+            report.append(r)
+            if on_result:
+                on_result(r)
+            if r['ok']:
+                yield output_name(r['file'], op), data
+        buf = io.StringIO()
+        w = csv.DictWriter(buf, ['file', 'ok', 'seconds', 'error'])
+        w.writeheader()
+        w.writerows(report)
+        yield 'report.csv', buf.getvalue()
+
+    return spooled_zip(entries()), report
@@ -0,0 +1,216 @@
+import argparse
+import os
+import sys
+
+from pdfeditor.batch import output_name, run_batch
+from pdfeditor.ebook import output_formats
+from pdfeditor.search import INDEX_PATH, LIMIT, SearchIndex
+from pdfeditor.spool import NamedBytesIO
+from pdfeditor.stamp import POSITIONS
+
+# command -> (operation name in batch.OPERATIONS, options -> operation kwargs)
+COMMANDS = {
+    'rotate': ('Rotate PDF', lambda a: {'rotation_angle': a.angle}),
+    'crop': ('Crop PDF', lambda a: {'box': tuple(a.box)}),
+    'watermark': ('Add Watermark', lambda a: {'text': a.text, 'image': _image(a.image), 'position': a.position,
+                                              'angle': a.angle, 'opacity': a.opacity, 'fontsize': a.font_size}),
+    'compress': ('Compress PDF', lambda a: {'preset': a.preset, 'linearize': a.linearize,
+                                            'target_size': a.target_kb * 1024 if a.target_kb else None}),
+    'page-numbers': ('Add Page Numbers', lambda a: {'fmt': a.format, 'prefix': a.prefix, 'start': a.start,
+                                                    'position': a.position, 'fontsize': a.font_size}),
+    'flatten': ('Flatten PDF', lambda a: {}),
+    'delete-pages': ('Delete Pages', lambda a: {'pages': [int(x) for x in a.pages.split(',')]}),
+    'encrypt': ('Encrypt PDF', lambda a: {'pwd': a.password}),
+    'decrypt': ('Decrypt PDF', lambda a: {'pwd': a.password}),
+    'ocr': ('OCR PDF to Text', lambda a: {}),
+    'to-docx': ('PDF to DOCX', lambda a: {}),
+    'to-spreadsheet': ('PDF to Spreadsheet', lambda a: {}),
+    'to-images': ('PDF to Images', lambda a: {'dpi': a.dpi}),
+    'extract-images': ('Extract Images', lambda a: {}),
+    'metadata': ('Extract Metadata', lambda a: {}),
+}
+
+
+def find_pdfs(paths):
+    """Yield (path, name relative to its input) for every PDF named directly or found under a directory."""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for f in sorted(files):
+                    if f.lower().endswith('.pdf'):
+                        full = os.path.join(root, f)
+                        yield full, os.path.relpath(full, path)
+        else:
+            yield path, os.path.basename(path)
+
+
+def _read(found):
+    for path, name in found:
+        with open(path, 'rb') as f:
+            yield name, f.read()
+
+
+def _image(path):
+    if path:
+        with open(path, 'rb') as f:
+            return f.read()
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def build_parser():
+    ap = argparse.ArgumentParser(prog='pdfeditor', description="Dev's PDF Editor operations without the UI.")
+    sub = ap.add_subparsers(dest='command', required=True)
+
+    def command(name, help):
+        p = sub.add_parser(name, help=help)
+        p.add_argument('inputs', nargs='+', help='PDF files or directories searched recursively')
+        p.add_argument('-o', '--output', default='.', help='output directory (default: current directory)')
+        p.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help='files processed in parallel')
+        return p
+
+    command('rotate', 'rotate every page').add_argument('--angle', type=int, choices=[90, 180, 270], default=90)
+    command('crop', 'set the crop box of every page').add_argument(
+        '--box', type=float, nargs=4, metavar=('X0', 'Y0', 'X1', 'Y1'), default=[0, 0, 612, 792])
+    p = command('watermark', 'stamp a text or image watermark')
+    p.add_argument('--text', default='Confidential')
+    p.add_argument('--image', help='PNG or JPEG to stamp instead of text')
+    p.add_argument('--position', choices=POSITIONS, default='center')
+    p.add_argument('--angle', type=float, default=45)
+    p.add_argument('--opacity', type=float, default=0.3)
+    p.add_argument('--font-size', type=float, default=48)
+    p = command('compress', 'recompress images and drop unused objects')
+    p.add_argument('--preset', choices=['screen', 'ebook', 'printer', 'lossless'], default='ebook')
+    p.add_argument('--target-kb', type=int, help='aim for this output size instead of a preset')
+    p.add_argument('--linearize', action='store_true')
+    p = command('page-numbers', 'number every page')
+    p.add_argument('--format', default='{n}', help="str.format template with n, total and prefix, "
+                                                   "e.g. 'Page {n} of {total}' or Bates '{prefix}{n:06d}'")
+    p.add_argument('--prefix', default='')
+    p.add_argument('--start', type=int, default=1)
+    p.add_argument('--position', choices=POSITIONS, default='bottom')
+    p.add_argument('--font-size', type=float, default=12)
+    command('flatten', 'flatten annotations into page content')
+    command('delete-pages', 'remove pages').add_argument('--pages', required=True, help='e.g. 1,3,5')
+    command('encrypt', 'password-protect').add_argument('--password', required=True)
+    command('decrypt', 'remove password protection').add_argument('--password', required=True)
+    command('ocr', 'extract text, OCRing pages without a text layer')
+    command('to-docx', 'convert to DOCX')
+    command('to-spreadsheet', 'convert to XLSX')
+    command('to-images', 'render pages to a ZIP of PNGs').add_argument(
+        '--dpi', type=int, help='default: 200, or the resolution of the scans when every page is one')
+    command('extract-images', 'extract embedded images to a ZIP')
+    command('metadata', 'dump document metadata')
+
+    p = sub.add_parser('merge', help='merge PDFs into one file')
+    p.add_argument('inputs', nargs='+')
+    p.add_argument('-o', '--output', default='merged.pdf', help='output file')
+    p = sub.add_parser('split', help='split into one file per page range')
+    p.add_argument('input')
+    p.add_argument('--ranges', required=True, help='e.g. 1-3,5-7')
+    p.add_argument('-o', '--output', default='.', help='output directory')
+    p = sub.add_parser('ebook', help='convert ebooks (EPUB, MOBI, FB2, XPS, HTML, TXT, ...) to another format')
+    p.add_argument('inputs', nargs='+')
+    p.add_argument('--to', choices=output_formats(), default='pdf')
+    p.add_argument('-o', '--output', default='.', help='output directory')
+    p = sub.add_parser('index', help='add PDFs to the full-text search index')
+    p.add_argument('inputs', nargs='+', help='PDF files or directories searched recursively')
+    p.add_argument('--index', default=INDEX_PATH, help='index file (default: %(default)s)')
+    p = sub.add_parser('search', help='find the pages of indexed PDFs that contain every word of a query')
+    p.add_argument('query', nargs='+', help='words to look for; end one with * to match a prefix')
+    p.add_argument('--index', default=INDEX_PATH, help='index file (default: %(default)s)')
+    p.add_argument('--limit', type=int, default=LIMIT)
+    return ap
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    from pdfeditor import operations as ops
+
+    if args.command == 'merge':
+        files = [open(path, 'rb') for path, _ in find_pdfs(args.inputs)]
+        try:
+            _write(args.output, ops.merge_pdfs(files).getvalue())
+        finally:
+            for f in files:
+                f.close()
+        print(args.output)
+        return 0
+    if args.command == 'split':
+        with open(args.input, 'rb') as f:
+            try:
+                parts = ops.split_pdf(f, args.ranges)
+            except ValueError as e:
+                print(f'{args.input}: {e}', file=sys.stderr)
+                return 1
+        stem = os.path.splitext(os.path.basename(args.input))[0]
+        for i, part in enumerate(parts, 1):
+            path = os.path.join(args.output, f'{stem}_part{i}.pdf')
+            _write(path, part.getvalue())
+            print(path)
+        return 0
+
+    if args.command == 'ebook':
+        failed = 0
+        for path in args.inputs:
+            with open(path, 'rb') as f:
+                src = NamedBytesIO(f.read(), os.path.basename(path))
+            try:
+                out = ops.convert_ebook(src, args.to)
+            except (ValueError, RuntimeError) as e:
+                failed += 1
+                print(f'{path}: {e}', file=sys.stderr)
+                continue
+            dest = os.path.join(args.output, os.path.splitext(src.name)[0] + '.' + args.to)
+            _write(dest, out.getvalue())
+            print(dest)
+        return 1 if failed else 0
+
+    if args.command == 'index':
+        index = SearchIndex(args.index)
+        failed = 0
+        for path, name in find_pdfs(args.inputs):
+            with open(path, 'rb') as f:
+                data = f.read()
+            try:
+                _, new = index.add(data, name)
+            except (ValueError, RuntimeError) as e:
+                failed += 1
+                print(f'{path}: {e}', file=sys.stderr)
+                continue
+            print(f"{name}\t{'indexed' if new else 'already indexed'}")
+        s = index.stats()
+        print(f"{s['documents']} documents, {s['pages']} pages in {args.index}")
+        return 1 if failed else 0
+    if args.command == 'search':
+        hits = SearchIndex(args.index).search(' '.join(args.query), limit=args.limit, mark=('[', ']'))
+        for h in hits:
+            print(f"{h['name']}:{h['page']}\t{' '.join(h['snippet'].split())}")
+        return 0 if hits else 1
+
+    if args.command == 'compress' and args.linearize:
+        from pdfeditor.compress import can_linearize
+        if not can_linearize():
+            print('warning: linearization is not supported by this PyMuPDF version; saving without it',
+                  file=sys.stderr)
+            args.linearize = False
+
+    op, to_kwargs = COMMANDS[args.command]
+    kwargs = to_kwargs(args)
+    found = list(find_pdfs(args.inputs))
+    # a single file runs in-process, which keeps one-off runs fast
+    results = run_batch(_read(found), op, min(args.jobs, len(found)) or 1, **kwargs)
+    failed = 0
+    for r in results:
+        if r['ok']:
+            path = os.path.join(args.output, output_name(r['file'], op))
+            _write(path, r['data'])
+            print(f"{path}\t{r['seconds']:.2f}s")
+        else:
+            failed += 1
+            print(f"{r['file']}: {r['error']}", file=sys.stderr)
+    return 1 if failed else 0
@@ -0,0 +1,186 @@
+import functools
+import io
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import pymupdf as fitz  # PyMuPDF
+
+from pdfeditor.metrics import stage
+from pdfeditor.render import to_image
+
+PRESETS = {
+    'screen': {'dpi': 72, 'quality': 40},
+    'ebook': {'dpi': 150, 'quality': 60},
+    'printer': {'dpi': 300, 'quality': 80},
+    'lossless': {'dpi': None, 'quality': None},
+}
+# tried in order by target-size mode until the output fits
+LADDER = [(300, 85), (200, 75), (150, 65), (120, 55), (96, 45), (72, 35), (50, 25)]
+CLASSES = ('images', 'fonts', 'content', 'other')
+
+
+class CompressReport:
+    def __init__(self):
+        self.before = dict.fromkeys(CLASSES, 0)
+        self.after = dict.fromkeys(CLASSES, 0)
+        self.images_recompressed = 0
+        self.images_skipped = 0
+        self.seconds = 0.0
+        self.settings = {}
+        self.warnings = []
+
+    def rows(self):
+        return [{'class': c, 'before': self.before[c], 'after': self.after[c]} for c in CLASSES]
+
+
+def object_sizes(doc):
+    """Bytes of stored stream data plus object dictionaries, bucketed by object class."""
+    fonts = set()
+    for x in range(1, doc.xref_length()):
+        for key in ('FontFile', 'FontFile2', 'FontFile3'):
+            t, v = doc.xref_get_key(x, key)
+            if t == 'xref':
+                fonts.add(int(v.split()[0]))
+    content = {x for page in doc for x in page.get_contents()}
+    sizes = dict.fromkeys(CLASSES, 0)
+    for x in range(1, doc.xref_length()):
+        try:
+            size = len(doc.xref_object(x, compressed=True))
+            if doc.xref_is_stream(x):
+                size += len(doc.xref_stream_raw(x))
+        except Exception:
+            continue
+        if doc.xref_is_image(x):
+            sizes['images'] += size
+        elif x in fonts or doc.xref_is_font(x):
+            sizes['fonts'] += size
+        elif x in content:
+            sizes['content'] += size
+        else:
+            sizes['other'] += size
+    return sizes
+
+
+@functools.lru_cache(maxsize=None)
+def can_linearize():
+    """Whether this PyMuPDF can still write linearized files (MuPDF dropped it in 1.24)."""
+    doc = fitz.open()
+    doc.new_page()
+    try:
+        doc.tobytes(linear=True)
+        return True
+    except Exception:  # FzErrorArgument in 1.24+, which is neither a ValueError nor a RuntimeError
+        return False
+    finally:
+        doc.close()
+
+
+def _image_dpi(doc):
+    # highest effective resolution each image is placed at, over all pages
+    dpi = {}
+    for page in doc:
+        for img in page.get_images(full=True):
+            xref, smask, w, h = img[0], img[1], img[2], img[3]
+            if smask or xref in dpi and dpi[xref] is None:
+                dpi[xref] = None  # soft-masked images are left alone
+                continue
+            for r in page.get_image_rects(xref):
+                if r.width > 0 and r.height > 0:
+                    d = max(w / (r.width / 72), h / (r.height / 72))
+                    dpi[xref] = max(dpi.get(xref) or 0, d)
+    return dpi
+
+
+def _jpeg(im, scale, quality):
+    if scale < 1:
+        im = im.resize((max(1, round(im.width * scale)), max(1, round(im.height * scale))), 3)  # bicubic
+    buf = io.BytesIO()
+    im.save(buf, 'JPEG', quality=quality, optimize=True)
+    return buf.getvalue(), im.width, im.height
+
+
+def _recompress(doc, dpi, quality, workers, report):
+    pending = deque()
+
+    def apply(xref, old, gray, fut):
+        data, w, h = fut.result()
+        if len(data) >= old:
+            report.images_skipped += 1
+            return
+        doc.update_stream(xref, data, compress=False)
+        for key, value in (('Filter', '/DCTDecode'), ('Width', str(w)), ('Height', str(h)),
+                           ('BitsPerComponent', '8'), ('ColorSpace', '/DeviceGray' if gray else '/DeviceRGB'),
+                           ('DecodeParms', 'null'), ('Decode', 'null')):
+            doc.xref_set_key(xref, key, value)
+        report.images_recompressed += 1
+
+    workers = workers or os.cpu_count()
+    with ThreadPoolExecutor(workers) as ex:
+        for xref, d in _image_dpi(doc).items():
+            # soft-masked, stencil and bilevel images compress far better as they are
+            if d is None or doc.xref_get_key(xref, 'ImageMask')[1] == 'true' \
+                    or doc.xref_get_key(xref, 'BitsPerComponent')[1] == '1':
+                report.images_skipped += 1
+                continue
+            scale = min(1.0, dpi / d) if dpi and d else 1.0
+            if scale >= 1 and quality >= 75 and doc.xref_get_key(xref, 'Filter')[1] == '/DCTDecode':
+                report.images_skipped += 1
+                continue
+            pix = fitz.Pixmap(doc, xref)
+            if pix.alpha:
+                pix = fitz.Pixmap(pix, 0)
+            gray = pix.colorspace is not None and pix.colorspace.n == 1
+            if not gray and pix.colorspace != fitz.csRGB:
+                pix = fitz.Pixmap(fitz.csRGB, pix)
+            old = len(doc.xref_stream_raw(xref))
+            pending.append((xref, old, gray, ex.submit(_jpeg, to_image(pix), scale, quality)))
+            while len(pending) > 2 * workers:
+                apply(*pending.popleft())
+        while pending:
+            apply(*pending.popleft())
+
+
+def compress(data, dpi=150, quality=60, linearize=False, subset_fonts=False, workers=None, report=None):
+    """Return compressed PDF bytes: downsample images above ``dpi``, re-encode them as JPEG at
+    ``quality`` and drop unused or duplicate objects. ``dpi``/``quality`` of None keep images as they are."""
+    report = report if report is not None else CompressReport()
+    t = time.perf_counter()
+    with stage('parse'):
+        doc = fitz.open(stream=data, filetype='pdf')
+    report.before = object_sizes(doc)
+    if quality:
+        with stage('images'):
+            _recompress(doc, dpi, quality, workers, report)
+    if subset_fonts:
+        doc.subset_fonts()
+    opts = dict(garbage=4, clean=True, deflate=True, deflate_images=True, deflate_fonts=True, use_objstms=1)
+    if linearize and not can_linearize():
+        linearize = False
+        report.warnings.append('Linearization is not supported by this PyMuPDF version; saved without it.')
+    with stage('save'):
+        out = doc.tobytes(linear=linearize, **opts)
+    doc.close()
+    after = fitz.open(stream=out, filetype='pdf')
+    report.after = object_sizes(after)
+    after.close()
+    report.settings = {'dpi': dpi, 'quality': quality, 'linearize': linearize}
+    report.seconds = time.perf_counter() - t
+    return out
+
+
+def compress_to_size(data, target_bytes, linearize=False, workers=None, report=None):
+    """Walk LADDER from gentle to aggressive and return the first result at or under ``target_bytes``,
+    or the smallest one tried."""
+    best = None
+    for dpi, quality in LADDER:
+        r = CompressReport()
+        out = compress(data, dpi, quality, linearize, workers=workers, report=r)
+        if best is None or len(out) < len(best[0]):
+            best = out, r
+        if len(out) <= target_bytes:
+            break
+    if report is not None:
+        report.__dict__.update(best[1].__dict__)
+    return best[0]
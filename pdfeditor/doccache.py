@@ -0,0 +1,97 @@
+import hashlib
+from collections import OrderedDict
+
+import pymupdf as fitz  # PyMuPDF
+
+from pdfeditor.preflight import analyze
+from pdfeditor.render import render_page
+from pdfeditor.spool import NamedBytesIO
+
+MAX_BYTES = 512 * 1024 * 1024
+
+
+class _Entry:
+    def __init__(self, name, data):
+        self.name = name
+        self.data = data
+        self.doc = fitz.open(stream=data, filetype='pdf')  # MuPDF loads objects lazily, on first use
+        self.page_count = len(self.doc)
+        self.thumbs = {}
+        self.profile = None
+
+    @property
+    def size(self):
+        # parsed structures are roughly as large again as the file itself
+        return 2 * len(self.data) + sum(len(t) for t in self.thumbs.values())
+
+
+class DocCache:
+    """Parsed uploads keyed on their content hash, kept across Streamlit reruns and operations.
+
+    ``document`` hands out the shared parsed document for read-only work;
+    ``upload`` hands out a file object over the cached bytes for operations
+    that edit their own copy. Entries are evicted least recently used first
+    once their estimated size passes ``max_bytes``.
+    """
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._ids = {}  # Streamlit file_id -> content hash, so reruns skip rehashing
+
+    def _entry(self, f):
+        fid = getattr(f, 'file_id', None)
+        key = self._ids.get(fid) if fid else None
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        data = f.getvalue() if hasattr(f, 'getvalue') else f.read()
+        key = hashlib.sha256(data).hexdigest()
+        if fid:
+            self._ids[fid] = key
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        self.misses += 1
+        entry = self._entries[key] = _Entry(getattr(f, 'name', key), data)
+        self._evict()
+        return entry
+
+    def _evict(self):
+        while len(self._entries) > 1 and sum(e.size for e in self._entries.values()) > self.max_bytes:
+            self._entries.popitem(last=False)
+        live = set(self._entries)
+        self._ids = {fid: key for fid, key in self._ids.items() if key in live}
+
+    def document(self, f):
+        return self._entry(f).doc
+
+    def upload(self, f):
+        e = self._entry(f)
+        return NamedBytesIO(e.data, e.name)
+
+    def page_count(self, f):
+        return self._entry(f).page_count
+
+    def thumbnail(self, f, page=0, dpi=100):
+        e = self._entry(f)
+        if (page, dpi) not in e.thumbs:
+            e.thumbs[page, dpi] = render_page(e.doc[page], dpi).tobytes('png')
+            self._evict()
+        return e.thumbs[page, dpi]
+
+    def profile(self, f):
+        e = self._entry(f)
+        if e.profile is None:
+            e.profile = analyze(e.doc)
+        return e.profile
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries), 'bytes': sum(e.size for e in self._entries.values()),
+                'max_bytes': self.max_bytes}
@@ -0,0 +1,110 @@
+import io
+import re
+import statistics
+
+import pymupdf as fitz  # PyMuPDF
+
+from pdfeditor.metrics import stage
+from pdfeditor.ocr import MIN_CHARS, has_text_layer, ocr_pages
+from pdfeditor.render import open_pdf
+
+DOCX_IMAGE_EXTS = {'png', 'jpeg', 'jpg', 'gif', 'bmp', 'tiff'}
+MAX_WIDTH = 6.5  # inches of usable width on a default Letter page
+HEADINGS = ((1.6, 1), (1.25, 2))  # font size relative to body text -> heading level
+_XML_ILLEGAL = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')  # control characters python-docx refuses
+
+
+def _body_size(blocks):
+    sizes = [round(s['size'], 1) for b in blocks if b['type'] == 0
+             for ln in b['lines'] for s in ln['spans'] if s['text'].strip()]
+    return statistics.median(sizes) if sizes else 11.0
+
+
+def _font_name(name):
+    # drop the subset tag (ABCDEF+) and style suffix (-Bold) from embedded font names
+    return name.split('+', 1)[-1].split('-', 1)[0] or None
+
+
+def _add_text_block(out, block, body):
+    from docx.shared import Pt, RGBColor
+    for ln in block['lines']:
+        for s in ln['spans']:
+            s['text'] = _XML_ILLEGAL.sub('', s['text'])
+    spans = [s for ln in block['lines'] for s in ln['spans'] if s['text'].strip()]
+    if not spans:
+        return
+    ratio = max(s['size'] for s in spans) / body
+    level = next((lvl for r, lvl in HEADINGS if ratio >= r), None)
+    para = out.add_heading(level=level) if level else out.add_paragraph()
+    for i, ln in enumerate(block['lines']):
+        for s in ln['spans']:
+            run = para.add_run(s['text'])
+            if level:
+                continue  # headings keep their style's font
+            run.bold = bool(s['flags'] & fitz.TEXT_FONT_BOLD)
+            run.italic = bool(s['flags'] & fitz.TEXT_FONT_ITALIC)
+            run.font.size = Pt(round(s['size'] * 2) / 2)
+            run.font.name = _font_name(s['font'])
+            if s['color']:
+                run.font.color.rgb = RGBColor(s['color'] >> 16 & 255, s['color'] >> 8 & 255, s['color'] & 255)
+        if i < len(block['lines']) - 1:
+            para.add_run(' ')
+
+
+def _add_image_block(out, block):
+    from docx.shared import Inches
+    data, ext = block['image'], block['ext'].lower()
+    if ext not in DOCX_IMAGE_EXTS:
+        from PIL import Image
+        buf = io.BytesIO()
+        Image.open(io.BytesIO(data)).save(buf, 'PNG')
+        data = buf.getvalue()
+    width = (block['bbox'][2] - block['bbox'][0]) / 72
+    out.add_picture(io.BytesIO(data), width=Inches(min(max(width, 0.1), MAX_WIDTH)))
+
+
+def convert(uploaded_file, progress=None, ocr=True, **ocr_kw):
+    """Rebuild a PDF as DOCX from its text blocks, spans and embedded images.
+
+    Each text block becomes a paragraph (or a heading when its type is much
+    larger than the body text) with one run per span carrying bold, italic,
+    size, font and colour. Image blocks become inline pictures. Only pages
+    without a usable text layer are OCRed, in parallel, and contribute their
+    recognised text; ``ocr_kw`` (dpi, workers, ...) go to ocr_pages.
+    """
+    from docx import Document
+    src = open_pdf(uploaded_file)
+    out = Document()
+    ocr_results = None
+    try:
+        n = len(src)
+        scanned = {p.number + 1 for p in src if not has_text_layer(p.get_text(), MIN_CHARS)} if ocr else set()
+        ocr_results = ocr_pages(src, pages=sorted(scanned), **ocr_kw)
+        for page in src:
+            if page.number + 1 in scanned:
+                _, text = next(ocr_results)
+                for chunk in _XML_ILLEGAL.sub('', text).split('\n\n'):
+                    if chunk.strip():
+                        out.add_paragraph(' '.join(chunk.split('\n')))
+            else:
+                blocks = page.get_text('dict', sort=True)['blocks']
+                body = _body_size(blocks)
+                for block in blocks:
+                    if block['type'] == 0:
+                        _add_text_block(out, block, body)
+                    elif block.get('image'):
+                        _add_image_block(out, block)
+            if page.number < n - 1:
+                out.add_page_break()
+            if progress:
+                progress(page.number + 1, n)
+    finally:
+        if ocr_results:
+            ocr_results.close()  # shuts the OCR pool down even when a page fails
+        if src is not uploaded_file:
+            src.close()
+    buf = io.BytesIO()
+    with stage('save'):
+        out.save(buf)
+    buf.seek(0)
+    return buf
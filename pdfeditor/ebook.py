@@ -0,0 +1,209 @@
+import abc
+import html
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pymupdf as fitz  # PyMuPDF
+
+from pdfeditor.metrics import stage
+
+# e.g. https://ebook-converter-api.onrender.com; unset, conversion never leaves the process
+API_URL = os.environ.get('PDFEDITOR_EBOOK_API')
+PAGE_SIZE = 'a5'  # page size reflowable books are laid out at
+FONTSIZE = 11
+CHUNKS_PER_WORKER = 4
+
+
+class Backend(abc.ABC):
+    """A converter from some input file extensions to some output formats."""
+
+    name = ''
+    inputs = ()
+    outputs = ()
+
+    def supports(self, ext, fmt):
+        return ext in self.inputs and fmt in self.outputs
+
+    @abc.abstractmethod
+    def convert(self, data, filename, fmt, progress=None):
+        """Return ``data`` converted to ``fmt`` as bytes."""
+
+
+class MuPDFBackend(Backend):
+    """Lays out and converts the formats MuPDF reads, in process, a group of chapters per worker."""
+
+    name = 'mupdf'
+    inputs = ('epub', 'mobi', 'fb2', 'xps', 'oxps', 'cbz', 'html', 'htm', 'xhtml', 'txt', 'pdf')
+    outputs = ('pdf', 'txt', 'html')
+
+    def __init__(self, page_size=PAGE_SIZE, fontsize=FONTSIZE, workers=None):
+        self.page_size = page_size
+        self.fontsize = fontsize
+        self.workers = workers
+
+    def supports(self, ext, fmt):
+        return super().supports(ext, fmt) and ext != fmt
+
+    def convert(self, data, filename, fmt, progress=None):
+        return convert_local(data, _ext(filename), fmt, self.page_size, self.fontsize, self.workers, progress)
+
+
+class RemoteBackend(Backend):
+    """Posts the file to an ebook-converter API; for formats MuPDF cannot write, such as EPUB or DOCX."""
+
+    name = 'remote'
+    inputs = ('pdf', 'epub', 'mobi', 'azw3', 'docx', 'html', 'txt')
+    outputs = ('epub', 'pdf', 'mobi', 'azw3', 'docx', 'htmlz', 'txt')
+
+    def __init__(self, url, timeout=120):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+
+    def convert(self, data, filename, fmt, progress=None):
+        import requests
+
+        try:
+            r = requests.post(f'{self.url}/convert', files={'file': (filename, data, 'application/octet-stream')},
+                              data={'output_format': fmt}, timeout=self.timeout)
+            r.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            raise RuntimeError(f'API request failed: {e}') from e
+        if 'application/json' in r.headers.get('content-type', ''):
+            raise RuntimeError(f"API error: {r.json().get('detail', 'Unknown error')}")
+        if not r.content:
+            raise RuntimeError('Received empty response from API')
+        return r.content
+
+
+# tried in order; the remote converter only ever sees what the local one cannot do or failed on
+BACKENDS = [MuPDFBackend()] + ([RemoteBackend(API_URL)] if API_URL else [])
+
+
+def input_formats():
+    return sorted({e for b in BACKENDS for e in b.inputs})
+
+
+def output_formats():
+    return sorted({f for b in BACKENDS for f in b.outputs})
+
+
+def _ext(filename):
+    return os.path.splitext(filename)[1].lstrip('.').lower()
+
+
+def convert(data, filename, fmt, progress=None):
+    """Convert the ebook ``data`` (its type taken from ``filename``) to ``fmt`` with the first backend
+    that handles the pair, moving on to the next one if it fails."""
+    ext = _ext(filename)
+    backends = [b for b in BACKENDS if b.supports(ext, fmt)]
+    if not backends:
+        raise ValueError(f'No converter from {ext or filename} to {fmt}')
+    for b in backends:
+        try:
+            return b.convert(data, filename, fmt, progress)
+        except Exception:
+            if b is backends[-1]:
+                raise
+
+
+def _open(data, ext, page_size, fontsize):
+    doc = fitz.open(stream=data, filetype=ext)
+    if doc.is_reflowable:
+        w, h = fitz.paper_size(page_size)
+        doc.layout(width=w, height=h, fontsize=fontsize)
+    return doc
+
+
+def _pages(doc, chapters):
+    # (chapter, page) locations only lay out the chapters asked for
+    for c in chapters:
+        for p in range(doc.chapter_page_count(c)):
+            yield doc[(c, p)]
+
+
+def _pdf_part(doc, chapters):
+    buf = io.BytesIO()
+    writer = fitz.DocumentWriter(buf)
+    for page in _pages(doc, chapters):
+        dev = writer.begin_page(page.rect)
+        # neither public route works here: Page.run wants a device attribute the writer's DeviceWrapper
+        # lacks, and Document.convert_to_pdf(from_page, to_page) loads its output page by the *input*
+        # page number, failing for any group after the first
+        fitz.mupdf.fz_run_page(page.this, dev.this, fitz.mupdf.FzMatrix(), fitz.mupdf.FzCookie())
+        writer.end_page()
+    writer.close()
+    return buf.getvalue()
+
+
+def _text_part(doc, chapters):
+    return ''.join(page.get_text() for page in _pages(doc, chapters))
+
+
+def _html_part(doc, chapters):
+    return ''.join(page.get_text('xhtml') for page in _pages(doc, chapters))
+
+
+_PARTS = {'pdf': _pdf_part, 'txt': _text_part, 'html': _html_part}
+_doc = None
+
+
+def _init(*args):
+    global _doc
+    _doc = _open(*args)
+
+
+def _worker(fmt, chapters):
+    return _PARTS[fmt](_doc, chapters)
+
+
+def _worker_toc():
+    return _doc.get_toc()
+
+
+def convert_local(data, ext, fmt, page_size=PAGE_SIZE, fontsize=FONTSIZE, workers=None, progress=None):
+    """Convert with MuPDF to 'pdf', 'txt' or 'html', laying out and converting contiguous groups of
+    chapters in parallel worker processes and joining the parts in reading order."""
+    doc = _open(data, ext, page_size, fontsize)
+    n = doc.chapter_count
+    k = min(n, (workers or os.cpu_count()) * CHUNKS_PER_WORKER)
+    groups = [range(n * i // k, n * (i + 1) // k) for i in range(k)]
+    workers = min(workers or os.cpu_count(), k)
+    ex = toc = None
+    if workers <= 1:
+        parts = (_PARTS[fmt](doc, g) for g in groups)
+    else:
+        ex = ProcessPoolExecutor(workers, initializer=_init, initargs=(data, ext, page_size, fontsize))
+        # the outline needs every chapter laid out, so it gets a worker of its own
+        toc = ex.submit(_worker_toc) if fmt == 'pdf' else None
+        parts = ex.map(_worker, [fmt] * k, groups)
+    out = fitz.open() if fmt == 'pdf' else []
+    try:
+        for i, part in enumerate(parts, 1):
+            with stage('convert'):
+                if fmt == 'pdf':
+                    with fitz.open(stream=part, filetype='pdf') as src:
+                        out.insert_pdf(src)
+                else:
+                    out.append(part)
+            if progress:
+                progress(i, k)
+        toc = toc.result() if toc else doc.get_toc() if fmt == 'pdf' else None
+    finally:
+        if ex:
+            ex.shutdown(cancel_futures=True)
+    meta = doc.metadata or {}
+    doc.close()
+    title = meta.get('title') or ''
+    if fmt == 'txt':
+        return ''.join(out).encode()
+    if fmt == 'html':
+        head = f'<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>{html.escape(title)}</title></head><body>\n'
+        return (head + ''.join(out) + '</body></html>\n').encode()
+    try:
+        out.set_toc(toc)
+    except ValueError:
+        pass  # outlines that skip levels are rejected by PyMuPDF; the pages are what matter
+    out.set_metadata({k: meta.get(k) or '' for k in ('title', 'author', 'subject', 'keywords')})
+    with stage('save'):
+        return out.tobytes(garbage=4, deflate=True)
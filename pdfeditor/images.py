@@ -0,0 +1,94 @@
+import io
+import os
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import pymupdf as fitz  # PyMuPDF
+
+from pdfeditor.metrics import stage
+from pdfeditor.render import to_image
+
+PASSTHROUGH = {'/DCTDecode': 'jpg', '/JPXDecode': 'jpx'}
+
+
+class ExtractReport:
+    def __init__(self):
+        self.images = []  # one dict per written image
+        self.duplicates = 0
+        self.bytes_saved = 0
+
+    @property
+    def total_bytes(self):
+        return sum(i['bytes'] for i in self.images)
+
+    @property
+    def total_seconds(self):
+        return sum(i['seconds'] for i in self.images)
+
+
+def _png(im):
+    # Pillow releases the GIL while deflating, so these run truly in parallel
+    t = time.perf_counter()
+    buf = io.BytesIO()
+    im.save(buf, 'PNG')
+    return buf.getvalue(), time.perf_counter() - t
+
+
+def _pixmap(doc, xref, smask):
+    pix = fitz.Pixmap(doc, xref)
+    if smask:
+        pix = fitz.Pixmap(pix, fitz.Pixmap(doc, smask))
+    if pix.colorspace and pix.colorspace.n not in (1, 3):
+        pix = fitz.Pixmap(fitz.csRGB, pix)
+    return pix
+
+
+def iter_images(doc, dedupe=True, workers=None, report=None):
+    """Yield (name, bytes) for the images of an open fitz document.
+
+    With ``dedupe`` every xref is emitted once, however many pages use it.
+    JPEG and JPEG 2000 streams without a soft mask are written as stored;
+    everything else is decoded here (PyMuPDF is single-threaded) and PNG
+    encoded on a thread pool. Timings and dedupe savings go to ``report``.
+    """
+    report = report if report is not None else ExtractReport()
+    seen = {}  # xref -> output size
+    dupes = Counter()  # xref -> times skipped; holds every xref already queued
+    workers = workers or os.cpu_count()
+    with ThreadPoolExecutor(workers) as ex:
+        pending = deque()
+        for pno in range(len(doc)):
+            for img in doc.get_page_images(pno):
+                xref, smask = img[0], img[1]
+                if dedupe and xref in dupes:
+                    dupes[xref] += 1
+                    continue
+                dupes[xref] += 0
+                t = time.perf_counter()
+                name = f'p{pno + 1}_x{xref}'
+                ext = PASSTHROUGH.get(doc.xref_get_key(xref, 'Filter')[1]) if not smask else None
+                if ext:
+                    data = doc.xref_stream_raw(xref)
+                    pending.append((xref, f'{name}.{ext}', 'passthrough', t, data, time.perf_counter() - t))
+                else:
+                    with stage('decode'):
+                        im = to_image(_pixmap(doc, xref, smask))
+                    pending.append((xref, f'{name}.png', 'png', t, ex.submit(_png, im), time.perf_counter() - t))
+                while len(pending) > 2 * workers:
+                    yield _finish(report, seen, *pending.popleft())
+        while pending:
+            yield _finish(report, seen, *pending.popleft())
+    report.duplicates += sum(dupes.values())
+    report.bytes_saved += sum(seen[x] * n for x, n in dupes.items())
+
+
+def _finish(report, seen, xref, name, mode, t, data, decode):
+    encode = 0.0
+    if not isinstance(data, bytes):
+        with stage('encode'):
+            data, encode = data.result()
+    seen[xref] = len(data)
+    report.images.append({'name': name, 'xref': xref, 'mode': mode, 'bytes': len(data),
+                          'seconds': decode + encode})
+    return name, data
@@ -0,0 +1,196 @@
+import inspect
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from pdfeditor.batch import OPERATIONS, output_bytes, output_name
+from pdfeditor.spool import NamedBytesIO
+
+JOBS_DIR = os.environ.get('PDFEDITOR_JOBS', os.path.join(os.path.expanduser('~'), '.cache', 'pdfeditor', 'jobs'))
+WORKERS = 2
+FINISHED = ('done', 'failed', 'cancelled')
+# finished jobs and their results are deleted this long after they last changed
+RETENTION = float(os.environ.get('PDFEDITOR_JOBS_RETENTION_HOURS', 24)) * 3600
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL DEFAULT '',
+    op TEXT NOT NULL,
+    file TEXT NOT NULL,
+    status TEXT NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    error TEXT NOT NULL DEFAULT '',
+    result TEXT NOT NULL DEFAULT '',
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+)
+'''
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def _reports_progress(op):
+    # running jobs can only be stopped from their progress callback
+    return 'progress' in inspect.signature(OPERATIONS[op][0]).parameters
+
+
+class JobQueue:
+    """Runs operations on a background thread pool and records them in a SQLite table.
+
+    Results are written next to the database, so completed jobs survive
+    Streamlit reruns, reconnecting browsers and server restarts. Jobs that
+    were queued or running when the process died are marked failed on start.
+
+    Every job belongs to an ``owner`` token; the lookups take the caller's
+    token and only ever see that owner's jobs. Finished jobs are deleted,
+    results included, ``retention`` seconds after they last changed.
+    """
+
+    def __init__(self, path=JOBS_DIR, workers=WORKERS, retention=RETENTION):
+        self.path = path
+        self.retention = retention
+        os.makedirs(path, exist_ok=True)
+        self._db = os.path.join(path, 'jobs.sqlite3')
+        self._cancelled = set()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix='pdfeditor-job')
+        self._expired_at = 0.0
+        with self._connect() as c:
+            c.execute(_SCHEMA)
+            if 'owner' not in {r[1] for r in c.execute('PRAGMA table_info(jobs)')}:
+                # jobs from before owners existed stay invisible to everyone until they expire
+                c.execute("ALTER TABLE jobs ADD COLUMN owner TEXT NOT NULL DEFAULT ''")
+            c.execute("UPDATE jobs SET status = 'failed', error = 'interrupted by a restart' "
+                      "WHERE status IN ('queued', 'running')")
+        self.expire()
+
+    def _connect(self):
+        # one short-lived connection per call keeps worker threads and the script thread independent
+        return sqlite3.connect(self._db, timeout=30)
+
+    def _update(self, job_id, **fields):
+        fields['updated'] = time.time()
+        cols = ', '.join(f'{k} = ?' for k in fields)
+        with self._connect() as c:
+            c.execute(f'UPDATE jobs SET {cols} WHERE id = ?', (*fields.values(), job_id))
+
+    def submit(self, owner, op, name, data, **kwargs):
+        if not owner:
+            raise ValueError('jobs need an owner')
+        self.expire()
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as c:
+            c.execute('INSERT INTO jobs (id, owner, op, file, status, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                      (job_id, owner, op, name, 'queued', now, now))
+        self._pool.submit(self._run, job_id, op, name, data, kwargs)
+        return job_id
+
+    def _run(self, job_id, op, name, data, kwargs):
+        try:
+            self._execute(job_id, op, name, data, kwargs)
+        finally:
+            with self._lock:
+                self._cancelled.discard(job_id)  # a request that came too late to act on
+
+    def _execute(self, job_id, op, name, data, kwargs):
+        if self._take_cancel(job_id):
+            self._update(job_id, status='cancelled')
+            return
+        self._update(job_id, status='running')
+        func, _ = OPERATIONS[op]
+
+        def progress(done, total):
+            self._update(job_id, done=done, total=total)
+            if self._take_cancel(job_id):
+                raise JobCancelled()
+
+        if _reports_progress(op):
+            kwargs = dict(kwargs, progress=progress)
+        try:
+            out = output_bytes(func(NamedBytesIO(data, name), **kwargs))
+            result = os.path.join(self.path, job_id + '_' + os.path.basename(output_name(name, op)))
+            with open(result, 'wb') as f:
+                f.write(out)
+            self._update(job_id, status='done', result=result)
+        except JobCancelled:
+            self._update(job_id, status='cancelled')
+        except Exception as e:
+            self._update(job_id, status='failed', error=f'{type(e).__name__}: {e}')
+
+    def _take_cancel(self, job_id):
+        with self._lock:
+            if job_id in self._cancelled:
+                self._cancelled.discard(job_id)
+                return True
+        return False
+
+    def cancel(self, job_id, owner):
+        """Request cancellation; queued jobs never start, running ones stop at their next page. Returns False
+        for jobs that cannot be cancelled (see the job's 'cancellable')."""
+        job = self.get(job_id, owner)
+        if not job or not job['cancellable']:
+            return False
+        with self._lock:
+            self._cancelled.add(job_id)
+        return True
+
+    def get(self, job_id, owner):
+        jobs = self._select(owner, 'id = ?', (job_id,), 1)
+        return jobs[0] if jobs else None
+
+    def list(self, owner, limit=50):
+        self.expire(throttle=60)
+        return self._select(owner, '1', (), limit)
+
+    def _select(self, owner, where, args, limit):
+        if not owner:
+            return []
+        with self._connect() as c:
+            c.row_factory = sqlite3.Row
+            rows = c.execute(f'SELECT * FROM jobs WHERE owner = ? AND {where} ORDER BY created DESC LIMIT ?',
+                             (owner, *args, limit))
+            jobs = [dict(r) for r in rows]
+        for job in jobs:
+            job['cancellable'] = job['status'] == 'queued' or (job['status'] == 'running'
+                                                                and _reports_progress(job['op']))
+        return jobs
+
+    def read(self, job_id, owner):
+        """The result of a finished job, read from disk only when asked for."""
+        job = self.get(job_id, owner)
+        if not job or job['status'] != 'done':
+            raise KeyError(job_id)
+        with open(job['result'], 'rb') as f:
+            return f.read()
+
+    def remove(self, job_id, owner):
+        job = self.get(job_id, owner)
+        if job and job['status'] in FINISHED:
+            self._delete(job)
+
+    def _delete(self, job):
+        if job['result'] and os.path.exists(job['result']):
+            os.unlink(job['result'])
+        with self._connect() as c:
+            c.execute('DELETE FROM jobs WHERE id = ?', (job['id'],))
+
+    def expire(self, throttle=0):
+        """Delete finished jobs, and their results, that have not changed for ``retention`` seconds."""
+        now = time.time()
+        if now - self._expired_at < throttle:
+            return
+        self._expired_at = now
+        with self._connect() as c:
+            c.row_factory = sqlite3.Row
+            old = [dict(r) for r in c.execute('SELECT id, result FROM jobs WHERE status IN (?, ?, ?) AND updated < ?',
+                                              (*FINISHED, now - self.retention))]
+        for job in old:
+            self._delete(job)
@@ -0,0 +1,192 @@
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import resource
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# optional outputs, written after every operation: a Prometheus textfile-collector file (totals of the
+# writing process) and a JSON-lines log with one trace per line
+METRICS_FILE = os.environ.get('PDFEDITOR_METRICS_FILE')
+METRICS_LOG = os.environ.get('PDFEDITOR_METRICS_LOG')
+RECENT = 50  # finished traces kept in memory
+PROFILE_LINES = 40
+
+_PAGE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+_trace = ContextVar('pdfeditor_trace', default=None)
+_session = ContextVar('pdfeditor_session', default=None)
+
+
+def rss_bytes():
+    """Current resident set size, or the peak where the current figure is not available."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class Trace:
+    """Timings and memory of one operation call, broken down by stage."""
+
+    def __init__(self, op):
+        self.op = op
+        self.started = time.time()
+        self.seconds = 0.0
+        self.stages = {}  # name -> [seconds, calls, rss growth in bytes]
+        self.rss_start = self.rss_peak = rss_bytes()
+        self.error = None
+        self.profile = None
+
+    def add(self, name, seconds, rss=None, calls=1):
+        s = self.stages.setdefault(name, [0.0, 0, 0])
+        s[0] += seconds
+        s[1] += calls
+        if rss is not None:
+            s[2] = max(s[2], rss - self.rss_start)
+            self.rss_peak = max(self.rss_peak, rss)
+
+    def as_dict(self):
+        return {
+            'op': self.op, 'started': round(self.started, 3), 'seconds': round(self.seconds, 4),
+            'rss_start_mb': round(self.rss_start / 2**20, 1), 'rss_peak_mb': round(self.rss_peak / 2**20, 1),
+            'error': self.error,
+            'stages': {k: {'seconds': round(s, 4), 'calls': n, 'rss_growth_mb': round(r / 2**20, 1)}
+                       for k, (s, n, r) in self.stages.items()},
+        }
+
+
+class Registry:
+    """Process-wide totals per operation and stage, plus the most recent traces."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ops = {}  # op -> [calls, errors, seconds, max seconds]
+        self.stages = {}  # (op, stage) -> [calls, seconds]
+        self.peak_rss = 0
+        self.recent = deque(maxlen=RECENT)
+
+    def record(self, trace):
+        with self._lock:
+            o = self.ops.setdefault(trace.op, [0, 0, 0.0, 0.0])
+            o[0] += 1
+            o[1] += trace.error is not None
+            o[2] += trace.seconds
+            o[3] = max(o[3], trace.seconds)
+            for name, (seconds, calls, _) in trace.stages.items():
+                s = self.stages.setdefault((trace.op, name), [0, 0.0])
+                s[0] += calls
+                s[1] += seconds
+            self.peak_rss = max(self.peak_rss, trace.rss_peak)
+            self.recent.append(trace)
+
+    def prometheus(self):
+        with self._lock:
+            lines = ['# HELP pdfeditor_operation_seconds Wall time of operation calls.',
+                     '# TYPE pdfeditor_operation_seconds summary']
+            for op, (calls, _, seconds, _) in sorted(self.ops.items()):
+                lines.append(f'pdfeditor_operation_seconds_count{{op="{op}"}} {calls}')
+                lines.append(f'pdfeditor_operation_seconds_sum{{op="{op}"}} {seconds:.6f}')
+            lines += ['# HELP pdfeditor_operation_errors_total Operation calls that raised.',
+                      '# TYPE pdfeditor_operation_errors_total counter']
+            lines += [f'pdfeditor_operation_errors_total{{op="{op}"}} {o[1]}' for op, o in sorted(self.ops.items())]
+            lines += ['# HELP pdfeditor_operation_max_seconds Slowest call of each operation.',
+                      '# TYPE pdfeditor_operation_max_seconds gauge']
+            lines += [f'pdfeditor_operation_max_seconds{{op="{op}"}} {o[3]:.6f}' for op, o in sorted(self.ops.items())]
+            lines += ['# HELP pdfeditor_stage_seconds Time spent in each stage of an operation.',
+                      '# TYPE pdfeditor_stage_seconds summary']
+            for (op, name), (calls, seconds) in sorted(self.stages.items()):
+                lines.append(f'pdfeditor_stage_seconds_count{{op="{op}",stage="{name}"}} {calls}')
+                lines.append(f'pdfeditor_stage_seconds_sum{{op="{op}",stage="{name}"}} {seconds:.6f}')
+            lines += ['# HELP pdfeditor_peak_rss_bytes Highest resident set size seen at a stage boundary.',
+                      '# TYPE pdfeditor_peak_rss_bytes gauge', f'pdfeditor_peak_rss_bytes {self.peak_rss}']
+            return '\n'.join(lines) + '\n'
+
+    def json(self):
+        with self._lock:
+            return json.dumps([t.as_dict() for t in self.recent], indent=1)
+
+
+REGISTRY = Registry()
+
+
+def _atomic_write(path, text):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def _export(trace):
+    if METRICS_LOG:
+        with open(METRICS_LOG, 'a') as f:
+            f.write(json.dumps(trace.as_dict()) + '\n')
+    if METRICS_FILE:
+        _atomic_write(METRICS_FILE, REGISTRY.prometheus())
+
+
+def collect(enabled=True, profile=False):
+    """Collect the traces of operations run from here on in the current context (a Streamlit script
+    run, say), optionally with a cProfile of each; returns the list they are appended to."""
+    traces = [] if enabled else None
+    _session.set((traces, profile) if enabled else None)
+    return traces
+
+
+def instrument(fn):
+    """Trace every call of an operation function; calls made inside another operation become a stage of it."""
+    op = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if _trace.get() is not None:
+            with stage(op):
+                return fn(*args, **kwargs)
+        trace = Trace(op)
+        traces, profile = _session.get() or (None, False)
+        profiler = cProfile.Profile() if profile else None
+        token = _trace.set(trace)
+        t = time.perf_counter()
+        try:
+            if profiler:
+                profiler.enable()
+            return fn(*args, **kwargs)
+        except BaseException as e:
+            trace.error = f'{type(e).__name__}: {e}'
+            raise
+        finally:
+            if profiler:
+                profiler.disable()
+                out = io.StringIO()
+                pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(PROFILE_LINES)
+                trace.profile = out.getvalue()
+            trace.seconds = time.perf_counter() - t
+            trace.rss_peak = max(trace.rss_peak, rss_bytes())
+            _trace.reset(token)
+            REGISTRY.record(trace)
+            if traces is not None:
+                traces.append(trace)
+            _export(trace)
+    return wrapper
+
+
+@contextmanager
+def stage(name):
+    """Time the block as stage ``name`` of the operation being traced; a no-op outside one."""
+    trace = _trace.get()
+    if trace is None:
+        yield
+        return
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, time.perf_counter() - t, rss_bytes())
@@ -0,0 +1,92 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pytesseract
+
+from pdfeditor.metrics import stage
+from pdfeditor.ocr_cache import default_cache
+from pdfeditor.render import open_pdf, render_pages, to_image
+
+DPI = 200
+LANG = 'eng'
+CHUNK = 8  # pages rendered ahead of the OCR results being consumed
+MIN_CHARS = 32  # fewer extractable characters than this and the page is treated as a scan
+
+
+def ocr_image(image, lang=LANG, config=''):
+    try:
+        return pytesseract.image_to_string(image, lang=lang, config=config)
+    except pytesseract.TesseractNotFoundError as e:
+        # this exception cannot be unpickled, which would surface as a BrokenProcessPool in the parent
+        raise RuntimeError(str(e)) from None
+
+
+def ocr_pages(pdf_file, dpi=DPI, lang=LANG, config='', workers=None, chunk=CHUNK, cache=None, pages=None):
+    """Yield (page_number, text) for every page of pdf_file, in page order.
+
+    ``pdf_file`` may be an open fitz document. ``pages`` restricts OCR to the
+    given 1-based page numbers. Pages whose raster is already in ``cache``
+    (the shared on-disk cache by default, ``False`` to disable) never reach
+    tesseract.
+    """
+    if cache is None:
+        cache = default_cache()
+    doc = open_pdf(pdf_file)
+    workers = workers or os.cpu_count()
+    chunk = max(chunk, 2 * workers)  # enough pages in flight to keep every worker busy
+    try:
+        with ProcessPoolExecutor(workers) as ex:
+            pending = deque()
+            for page, pix in render_pages(doc, dpi, 'gray', pages):
+                im = to_image(pix)
+                key = text = None
+                if cache:
+                    key = cache.key(im, dpi, lang, config)
+                    text = cache.get(key)
+                pending.append((page, key, text if text is not None else ex.submit(ocr_image, im, lang, config)))
+                # bound the number of page bitmaps alive at once
+                while len(pending) > chunk:
+                    yield _result(cache, *pending.popleft())
+            while pending:
+                yield _result(cache, *pending.popleft())
+    finally:
+        if doc is not pdf_file:
+            doc.close()
+
+
+def _result(cache, page, key, text):
+    if isinstance(text, str):
+        return page, text
+    with stage('ocr'):
+        text = text.result()
+    if cache:
+        cache.put(key, text)
+    return page, text
+
+
+def has_text_layer(text, min_chars=MIN_CHARS):
+    chars = len(text.strip())
+    # fonts without a usable ToUnicode map extract as replacement characters
+    return chars >= min_chars and text.count('�') < chars / 10
+
+
+def extract_text(pdf_file, min_chars=MIN_CHARS, **ocr_kw):
+    """Yield (page_number, text) for every page, OCRing only pages without a usable text layer."""
+    doc = open_pdf(pdf_file)
+    texts = {}
+    scanned = []
+    for page in doc:
+        text = page.get_text()
+        if has_text_layer(text, min_chars):
+            texts[page.number + 1] = text
+        else:
+            scanned.append(page.number + 1)
+    ocr = ocr_pages(doc, pages=scanned, **ocr_kw)  # lazy: no pool unless a page needs OCR
+    try:
+        for p in range(1, len(doc) + 1):
+            yield (p, texts.pop(p)) if p in texts else next(ocr)
+    finally:
+        ocr.close()
+        if doc is not pdf_file:
+            doc.close()
@@ -0,0 +1,99 @@
+import hashlib
+import os
+import threading
+
+CACHE_DIR = os.environ.get('PDFEDITOR_OCR_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'pdfeditor', 'ocr'))
+MAX_BYTES = 64 * 1024 * 1024
+
+
+class OCRCache:
+    """On-disk page text store keyed on the page raster, evicting least recently used entries."""
+
+    def __init__(self, path=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self._size = sum(size for _, size, _ in self._entries())
+
+    @staticmethod
+    def key(image, dpi, lang, config):
+        h = hashlib.sha256()
+        h.update(f'{image.mode}:{image.size}:{dpi}:{lang}:{config}:'.encode())
+        h.update(image.tobytes())
+        return h.hexdigest()
+
+    def _file(self, key):
+        return os.path.join(self.path, key + '.txt')
+
+    def get(self, key):
+        p = self._file(key)
+        try:
+            with open(p, encoding='utf-8') as f:
+                text = f.read()
+            os.utime(p)  # mtime doubles as the LRU clock
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return text
+
+    def put(self, key, text):
+        p = self._file(key)
+        tmp = f'{p}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(text)
+        old = os.path.getsize(p) if os.path.exists(p) else 0
+        os.replace(tmp, p)
+        with self._lock:
+            self._size += os.path.getsize(p) - old
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        # (mtime, size, path) of every cached text; other processes may delete or write files meanwhile
+        out = []
+        for e in os.scandir(self.path):
+            if e.name.endswith('.txt'):
+                try:
+                    st = e.stat()
+                except FileNotFoundError:
+                    continue
+                out.append((st.st_mtime, st.st_size, e.path))
+        return out
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self._size <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass  # evicted by another process
+            self._size -= size
+
+    def clear(self):
+        with self._lock:
+            for e in os.scandir(self.path):
+                if e.name.endswith('.txt'):
+                    os.unlink(e.path)
+            self._size = 0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'bytes': self._size, 'max_bytes': self.max_bytes}
+
+
+_default = None
+
+
+def default_cache():
+    global _default
+    if _default is None:
+        _default = OCRCache()
+    return _default
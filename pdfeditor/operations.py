@@ -0,0 +1,254 @@
+import io
+import os
+import tempfile
+
+import PyPDF2
+import pymupdf as fitz  # PyMuPDF
+
+from pdfeditor.archive import spooled_zip
+from pdfeditor.compress import PRESETS, compress, compress_to_size
+from pdfeditor.images import iter_images
+from pdfeditor.metrics import instrument, stage
+from pdfeditor.pipeline import run_pipeline
+from pdfeditor.render import open_pdf, render_pages
+
+# pytesseract, python-docx and img2pdf cost more to import than most operations take
+# to run, so they are imported by the functions that need them.
+
+CPUS = None  # cap on the workers an operation uses; the batch runner's worker processes set it to 1
+
+
+def _save(doc, garbage=1, **kwargs):
+    buf = io.BytesIO()
+    with stage('save'):
+        doc.save(buf, garbage=garbage, **kwargs)
+    doc.close()
+    buf.seek(0)
+    return buf
+
+def _plan(src, op, sample=None):
+    # pre-flight: profile the document once and let that pick the settings worth using on it
+    from pdfeditor.preflight import SAMPLE_PAGES, analyze, route
+    with stage('preflight'):
+        return route(analyze(src, SAMPLE_PAGES if sample is None else sample), op, cpus=CPUS)
+
+def _tracked(items, total, progress):
+    # progress(done, total) after every page; long operations are cancelled by raising from it
+    for i, item in enumerate(items, 1):
+        yield item
+        if progress:
+            progress(i, total)
+
+@instrument
+def convert_ebook(input_file, output_format, progress=None):
+    from pdfeditor.ebook import convert
+    return io.BytesIO(convert(input_file.read(), input_file.name, output_format, progress))
+
+@instrument
+def merge_pdfs(uploaded_files):
+    out = fitz.open()
+    for file in uploaded_files:
+        src = open_pdf(file)
+        out.insert_pdf(src)
+        if src is not file:
+            src.close()
+    # garbage=4 also merges identical streams, so fonts and images shared between inputs are kept once
+    return _save(out, garbage=4)
+
+@instrument
+def split_pdf(uploaded_file, page_ranges):
+    src = open_pdf(uploaded_file)
+    output_files = []
+    try:
+        for rng in page_ranges.split(','):
+            start, end = map(int, rng.split('-'))
+            # insert_pdf reverses backwards ranges and clamps out-of-range ones instead of failing
+            if not 1 <= start <= end <= len(src):
+                raise ValueError(f'Invalid page range {rng.strip()}: the document has {len(src)} pages')
+            part = fitz.open()
+            part.insert_pdf(src, from_page=start-1, to_page=end-1)
+            output_files.append(_save(part))
+    finally:
+        if src is not uploaded_file:
+            src.close()
+    return output_files
+
+@instrument
+def rotate_pdf(uploaded_file, rotation_angle):
+    return run_pipeline(uploaded_file, [('rotate', {'angle': rotation_angle})])
+
+@instrument
+def images_to_pdf(image_files):
+    import img2pdf
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for img in image_files:
+            p = os.path.join(tmp, img.name)
+            with open(p, 'wb') as f:
+                f.write(img.read())
+            paths.append(p)
+        out = io.BytesIO()
+        out.write(img2pdf.convert(paths, rotation=img2pdf.Rotation.ifvalid))
+        out.seek(0)
+        return out
+#def images_to_pdf(image_files):
+#    with tempfile.TemporaryDirectory() as tmp:
+#        paths = []
+#        for img in image_files:
+#            p = os.path.join(tmp, img.name)
+#            with open(p, 'wb') as f:
+#                f.write(img.read())
+#            paths.append(p)
+#        out = io.BytesIO()
+#        out.write(img2pdf.convert(paths))
+#        out.seek(0)
+#        return out
+
+def iter_page_images(uploaded_file, dpi=200, progress=None):
+    doc = open_pdf(uploaded_file)
+    try:
+        for i, pix in _tracked(render_pages(doc, dpi), len(doc), progress):
+            with stage('encode'):
+                data = pix.tobytes('png')
+            yield f'page_{i}.png', data
+    finally:
+        if doc is not uploaded_file:
+            doc.close()
+
+@instrument
+def pdf_to_images(uploaded_file, dpi=None, progress=None):
+    # dpi=None renders at 200 dpi, or at the scans' own resolution when every page is one
+    doc = open_pdf(uploaded_file)
+    try:
+        if dpi is None:
+            dpi = _plan(doc, 'PDF to Images')['dpi']
+        return spooled_zip(iter_page_images(doc, dpi, progress))
+    finally:
+        if doc is not uploaded_file:
+            doc.close()
+
+@instrument
+def crop_pdf(uploaded_file, box):
+    return run_pipeline(uploaded_file, [('crop', {'box': box})])
+
+@instrument
+def ocr_pdf(uploaded_file, progress=None):
+    from pdfeditor.ocr import extract_text
+    doc = open_pdf(uploaded_file)
+    buf = io.BytesIO()
+    try:
+        plan = _plan(doc, 'OCR PDF to Text')
+        for _, text in _tracked(extract_text(doc, dpi=plan['dpi'], workers=plan['workers']), len(doc), progress):
+            buf.write((text + '\n').encode())
+    finally:
+        if doc is not uploaded_file:
+            doc.close()
+    buf.seek(0)
+    return buf
+
+@instrument
+def index_documents(uploaded_files, index=None, progress=None, owner=''):
+    """Add PDFs to ``owner``'s part of the full-text search index; returns a dict of file, hash, new (whether
+    its text was extracted) and error per file. A file that cannot be read or OCRed gets an error and no hash
+    instead of stopping the rest."""
+    from pdfeditor.search import default_index
+    index = index or default_index()
+    out = []
+    for f in _tracked(uploaded_files, len(uploaded_files), progress):
+        name = getattr(f, 'name', 'document.pdf')
+        try:
+            key, new = index.add(f.getvalue() if hasattr(f, 'getvalue') else f.read(), name, owner=owner)
+        except (ValueError, RuntimeError) as e:
+            out.append({'file': name, 'hash': None, 'new': False, 'error': str(e)})
+            continue
+        out.append({'file': name, 'hash': key, 'new': new, 'error': ''})
+    return out
+
+@instrument
+def pdf_to_docx(uploaded_file, progress=None):
+    from pdfeditor.docx_convert import convert
+    doc = open_pdf(uploaded_file)
+    try:
+        plan = _plan(doc, 'PDF to DOCX')
+        return convert(doc, progress=progress, dpi=plan['dpi'], workers=plan['workers'])
+    finally:
+        if doc is not uploaded_file:
+            doc.close()
+
+@instrument
+def pdf_to_spreadsheet(uploaded_file, progress=None):
+    from pdfeditor.tables import tables_to_xlsx
+    doc = open_pdf(uploaded_file)
+    try:
+        return tables_to_xlsx(doc, workers=_plan(doc, 'PDF to Spreadsheet')['workers'], progress=progress)
+    finally:
+        if doc is not uploaded_file:
+            doc.close()
+
+@instrument
+def add_watermark(uploaded_file, text='', **opts):
+    return run_pipeline(uploaded_file, [('watermark', dict(opts, text=text))])
+
+@instrument
+def compress_pdf(uploaded_file, preset='ebook', target_size=None, linearize=False, report=None):
+    data = uploaded_file.read()
+    plan = _plan(data, 'Compress PDF', sample=0)  # only the images matter
+    if target_size:
+        out = compress_to_size(data, target_size, linearize=linearize, workers=plan['workers'], report=report)
+    else:
+        settings = PRESETS[preset] if plan['images'] else {'dpi': None, 'quality': None}
+        out = compress(data, linearize=linearize, workers=plan['workers'], report=report, **settings)
+    return io.BytesIO(out)
+
+@instrument
+def extract_metadata(uploaded_file):
+    md = PyPDF2.PdfReader(uploaded_file).metadata or {}
+    txt = '\n'.join(f"{k}: {v}" for k, v in md.items())
+    buf = io.BytesIO()
+    buf.write(txt.encode())
+    buf.seek(0)
+    return buf
+
+# Advanced features
+@instrument
+def encrypt_pdf(uploaded_file, pwd):
+    doc = fitz.open(stream=uploaded_file.read(), filetype='pdf')
+    return _save(doc, encryption=fitz.PDF_ENCRYPT_AES_256, user_pw=pwd, owner_pw=pwd)
+
+@instrument
+def decrypt_pdf(uploaded_file, pwd):
+    doc = fitz.open(stream=uploaded_file.read(), filetype='pdf')
+    if doc.needs_pass and not doc.authenticate(pwd):
+        doc.close()
+        raise ValueError("Incorrect password")
+    return _save(doc, encryption=fitz.PDF_ENCRYPT_NONE)
+
+@instrument
+def delete_pages(uploaded_file, pages):
+    return run_pipeline(uploaded_file, [('delete_pages', {'pages': pages})])
+
+@instrument
+def insert_pages(base, ins, pos):
+    doc = fitz.open(stream=base.read(), filetype='pdf')
+    src = open_pdf(ins)
+    doc.insert_pdf(src, start_at=pos)
+    if src is not ins:
+        src.close()
+    return _save(doc)
+
+@instrument
+def extract_images(uploaded_file, dedupe=True, report=None):
+    doc = open_pdf(uploaded_file)
+    try:
+        return spooled_zip(iter_images(doc, dedupe=dedupe, workers=CPUS, report=report))
+    finally:
+        if doc is not uploaded_file:
+            doc.close()
+
+@instrument
+def add_page_numbers(uploaded_file, **opts):
+    return run_pipeline(uploaded_file, [('page_numbers', opts)])
+
+@instrument
+def flatten_pdf(uploaded_file):
+    return run_pipeline(uploaded_file, [('flatten', {})])
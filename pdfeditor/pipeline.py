@@ -0,0 +1,116 @@
+import io
+import os
+import shutil
+import tempfile
+
+import pymupdf as fitz  # PyMuPDF
+
+from pdfeditor.metrics import stage
+from pdfeditor.spool import LARGE_FILE_BYTES, disk_output, spool, upload_size
+from pdfeditor.stamp import image_stamp, stamp, text_stamp
+
+# Each step edits an open document in place; a pipeline parses once and saves once.
+
+
+def rotate(doc, angle):
+    for p in doc:
+        p.set_rotation((p.rotation + angle) % 360)
+
+
+def delete_pages(doc, pages):
+    doc.delete_pages(sorted({p - 1 for p in pages if 0 < p <= len(doc)}))
+
+
+def crop(doc, box):
+    for p in doc:
+        p.set_cropbox(fitz.Rect(*box))
+
+
+def watermark(doc, text='', image=None, position='center', angle=45, opacity=0.3, fontsize=48):
+    mark = image_stamp(image, opacity) if image else text_stamp(text, fontsize, opacity=opacity)
+    stamp(doc, mark, position=position, angle=angle)
+
+
+def page_numbers(doc, fmt='{n}', position='bottom', start=1, prefix='', fontsize=12):
+    stamp(doc, number=fmt, number_position=position, start=start, prefix=prefix, fontsize=fontsize)
+
+
+def flatten(doc):
+    doc.bake(annots=True, widgets=True)
+
+
+# step name -> (label, function)
+STEPS = {
+    'rotate': ('Rotate', rotate),
+    'delete_pages': ('Delete Pages', delete_pages),
+    'crop': ('Crop', crop),
+    'watermark': ('Add Watermark', watermark),
+    'page_numbers': ('Add Page Numbers', page_numbers),
+    'flatten': ('Flatten', flatten),
+}
+
+
+def run_pipeline(uploaded_file, steps, large=None):
+    """Apply (step name, kwargs) steps in order to one parsed document and serialize it once.
+
+    Uploads above LARGE_FILE_BYTES (or with ``large=True``) go through
+    run_pipeline_on_disk and come back as a file object instead of a BytesIO.
+    """
+    if large is None:
+        large = upload_size(uploaded_file) > LARGE_FILE_BYTES
+    if large:
+        return run_pipeline_on_disk(uploaded_file, steps)
+    with stage('read'):
+        data = uploaded_file.read()
+    with stage('parse'):
+        doc = fitz.open(stream=data, filetype='pdf')
+    try:
+        with stage('edit'):
+            for name, kwargs in steps:
+                STEPS[name][1](doc, **kwargs)
+        buf = io.BytesIO()
+        with stage('save'):
+            doc.save(buf, garbage=1)
+    finally:
+        doc.close()
+    buf.seek(0)
+    return buf
+
+
+def run_pipeline_on_disk(uploaded_file, steps):
+    """Like run_pipeline, but the input is spooled to disk, MuPDF reads it from the file on demand and
+    the edits are appended as an incremental update, so memory does not grow with the file size."""
+    src, spooled = spool(uploaded_file)
+    fd, out = tempfile.mkstemp(suffix='.pdf')
+    os.close(fd)
+    try:
+        with stage('spool'):
+            if spooled:
+                os.replace(src, out)  # already a private copy
+            else:
+                shutil.copyfile(src, out)  # the caller's own file is never edited in place
+        with stage('parse'):
+            doc = fitz.open(out)
+        full = None
+        try:
+            with stage('edit'):
+                for name, kwargs in steps:
+                    STEPS[name][1](doc, **kwargs)
+            with stage('save'):
+                if doc.can_save_incrementally():
+                    doc.saveIncr()
+                else:
+                    # repaired or encrypted files need a full rewrite, which cannot target the open file
+                    full = out + '.full'
+                    doc.save(full, garbage=1)
+        finally:
+            doc.close()
+        if full:
+            os.replace(full, out)
+    except BaseException:
+        os.unlink(out)
+        raise
+    finally:
+        if spooled and os.path.exists(src):
+            os.unlink(src)
+    return disk_output(out)
@@ -0,0 +1,184 @@
+import math
+import os
+import statistics
+import time
+
+from pdfeditor.ocr import DPI as OCR_DPI, has_text_layer
+from pdfeditor.render import DPI as RENDER_DPI, open_pdf
+
+SAMPLE_PAGES = 50  # pages looked at; longer documents are sampled evenly and extrapolated
+MIN_PAGES_PER_WORKER = 4  # below this a process pool costs more than it saves
+OCR_DPI_RANGE = (150, 300)  # tesseract loses accuracy below and only time above
+FULL_PAGE = 0.85  # image coverage from which a page counts as a scan
+# rough single-core costs in seconds, per page or per megapixel, from benchmarks/bench_ops.py runs
+COSTS = {
+    'page': 0.002,  # parse, edit and save
+    'text': 0.0015,  # text extraction
+    'render': 0.003,  # per megapixel rasterised
+    'png': 0.035,  # per megapixel encoded
+    'ocr': 0.25,  # per megapixel through tesseract
+    'image': 0.04,  # per megapixel of embedded image decoded and re-encoded
+    'docx': 0.035,  # layout analysis and writing
+}
+
+
+class Profile:
+    """What a single pass over (a sample of) a document found."""
+
+    def __init__(self):
+        self.pages = 0
+        self.sampled = 0
+        self.encrypted = False
+        self.text_pages = 0  # pages with a usable text layer, extrapolated from the sample
+        self.scanned_pages = 0  # pages that need OCR
+        self.coverage = []  # per sampled page: (page number, characters, image coverage 0-1)
+        self.images = 0
+        self.image_mpx = 0.0  # megapixels over all distinct images
+        self.image_dpi = []  # effective resolution of every placed image in the sample
+        self.scan_dpi = None  # median resolution of full-page scans
+        self.fonts = {}  # name -> embedded
+        self.page_area = 0.0  # mean page area in square inches
+        self.seconds = 0.0
+
+    def rows(self):
+        dpi = sorted(self.image_dpi)
+        pages = f'{self.pages} ({self.sampled} sampled)' if self.sampled < self.pages else str(self.pages)
+        missing = sum(not embedded for embedded in self.fonts.values())
+        return [
+            {'property': 'pages', 'value': pages},
+            {'property': 'encrypted', 'value': 'yes' if self.encrypted else 'no'},
+            {'property': 'pages with text', 'value': str(self.text_pages)},
+            {'property': 'pages needing OCR', 'value': str(self.scanned_pages)},
+            {'property': 'images', 'value': f'{self.images} ({self.image_mpx:.0f} MP)'},
+            {'property': 'image resolution', 'value': f'{dpi[0]:.0f}-{dpi[-1]:.0f} dpi' if dpi else '-'},
+            {'property': 'fonts', 'value': f'{len(self.fonts)} ({missing} not embedded)'},
+        ]
+
+
+def _sample(n, k):
+    if k <= 1:
+        return range(min(n, k))
+    if n <= k:
+        return range(n)
+    return sorted({round(i * (n - 1) / (k - 1)) for i in range(k)})
+
+
+def _images(doc):
+    # every image object in the file, counted from the xref table rather than the sampled pages
+    images, masks = {}, set()
+    for x in range(1, doc.xref_length()):
+        if doc.xref_is_image(x):
+            w, h = (doc.xref_get_key(x, k)[1] for k in ('Width', 'Height'))
+            images[x] = int(w) * int(h) / 1e6 if w.isdigit() and h.isdigit() else 0.0
+            t, v = doc.xref_get_key(x, 'SMask')
+            if t == 'xref':
+                masks.add(int(v.split()[0]))
+    return len(images.keys() - masks), sum(m for x, m in images.items() if x not in masks)
+
+
+def analyze(src, sample=SAMPLE_PAGES):
+    """Profile ``src`` (an open document, bytes or file) from text, image and font listings alone;
+    nothing is rendered or decoded. ``sample=0`` skips the pages and only counts and measures images."""
+    t = time.perf_counter()
+    p = Profile()
+    doc = open_pdf(src)
+    try:
+        p.encrypted = bool(doc.is_encrypted or doc.needs_pass or (doc.metadata or {}).get('encryption'))
+        if doc.needs_pass:
+            return p
+        p.pages = len(doc)
+        numbers = _sample(p.pages, sample)
+        p.sampled = len(numbers)
+        text = 0
+        area = 0.0
+        scan_dpi = []
+        for i in numbers:
+            page = doc[i]
+            rect = page.rect
+            area += rect.width * rect.height / 72 ** 2
+            chars = page.get_text()
+            covered = 0.0
+            largest = None
+            # without xrefs, which would hash every image's pixels
+            for info in page.get_image_info():
+                box = info['bbox']
+                w, h = box[2] - box[0], box[3] - box[1]
+                if w <= 0 or h <= 0:
+                    continue
+                covered += w * h
+                dpi = max(info['width'] / (w / 72), info['height'] / (h / 72))
+                p.image_dpi.append(dpi)
+                if largest is None or w * h > largest[0]:
+                    largest = w * h, dpi
+            covered = min(1.0, covered / (rect.width * rect.height)) if rect.width and rect.height else 0.0
+            if has_text_layer(chars):
+                text += 1
+            elif largest and covered >= FULL_PAGE:
+                scan_dpi.append(largest[1])
+            p.coverage.append((i + 1, len(chars.strip()), round(covered, 2)))
+            for xref, ext, _, name, *_ in page.get_fonts():
+                p.fonts[name or f'xref {xref}'] = ext != 'n/a'
+        scale = p.pages / p.sampled if p.sampled else 0
+        p.text_pages = round(text * scale)
+        p.scanned_pages = p.pages - p.text_pages if p.sampled else 0
+        p.images, p.image_mpx = _images(doc)
+        p.scan_dpi = statistics.median(scan_dpi) if scan_dpi else None
+        p.page_area = area / p.sampled if p.sampled else 0.0
+    finally:
+        if doc is not src:
+            doc.close()
+    p.seconds = time.perf_counter() - t
+    return p
+
+
+def _workers(units, cpus=None):
+    return max(1, min(cpus or os.cpu_count() or 1, math.ceil(units / MIN_PAGES_PER_WORKER)))
+
+
+def _mpx(p, dpi):
+    return p.page_area * dpi ** 2 / 1e6
+
+
+def route(p, op, dpi=None, cpus=None):
+    """Pick the cheapest settings for running operation ``op`` (a batch.OPERATIONS name) on a document
+    with profile ``p``, using at most ``cpus`` workers (all by default); returns a dict of what was chosen,
+    'seconds' (estimated time) and 'notes'. Raises ValueError for documents that cannot be read without
+    their password."""
+    if p.encrypted and not p.pages:
+        raise ValueError('password protected: decrypt it first')
+    plan = {'seconds': p.pages * COSTS['page'], 'notes': []}
+    if op in ('OCR PDF to Text', 'PDF to DOCX', 'PDF to Spreadsheet'):
+        ocr_dpi = OCR_DPI
+        if op == 'PDF to Spreadsheet':
+            from pdfeditor.tables import OCR_DPI as ocr_dpi  # word boxes for table structure need it
+        elif p.scan_dpi:
+            # OCR at the scan's own resolution: rendering finer only invents pixels
+            ocr_dpi = round(min(max(p.scan_dpi, OCR_DPI_RANGE[0]), OCR_DPI_RANGE[1]))
+        # text pages cost less than starting a pool, so workers are sized by the scans alone
+        workers = _workers(p.scanned_pages, cpus) if p.scanned_pages else 1
+        plan.update(ocr=p.scanned_pages > 0, dpi=ocr_dpi, workers=workers)
+        per_scan = _mpx(p, ocr_dpi) * (COSTS['render'] + COSTS['ocr'])
+        plan['seconds'] = p.pages * COSTS['text'] + p.scanned_pages * per_scan / workers
+        if op != 'OCR PDF to Text':
+            plan['seconds'] += p.pages * COSTS['docx']
+        if not p.scanned_pages:
+            plan['notes'].append('every page has a text layer: no OCR')
+        elif p.text_pages:
+            plan['notes'].append(f'OCR only the {p.scanned_pages} pages without a text layer')
+        if p.scanned_pages:
+            plan['notes'].append(f'OCR at {ocr_dpi} dpi on {workers} worker(s)')
+    elif op == 'PDF to Images':
+        render_dpi = dpi or RENDER_DPI
+        if p.scan_dpi and not p.text_pages and not dpi:
+            # every page is a single scan: render at its resolution rather than upsampling it
+            render_dpi = round(min(render_dpi, max(p.scan_dpi, 72)))
+            plan['notes'].append(f'pages are {p.scan_dpi:.0f} dpi scans: rendering at {render_dpi} dpi')
+        plan.update(dpi=render_dpi)
+        plan['seconds'] = p.pages * _mpx(p, render_dpi) * (COSTS['render'] + COSTS['png'])
+    elif op == 'Compress PDF':
+        workers = max(1, min(cpus or os.cpu_count() or 1, p.images))
+        plan.update(images=p.images > 0, workers=workers)
+        plan['seconds'] += p.image_mpx * COSTS['image'] / workers
+        if not plan['images']:
+            plan['notes'].append('no images: only unused objects and streams are compressed')
+    return plan
@@ -0,0 +1,33 @@
+import pymupdf as fitz  # PyMuPDF
+from PIL import Image
+
+from pdfeditor.metrics import stage
+
+DPI = 200
+COLORSPACES = {'rgb': fitz.csRGB, 'gray': fitz.csGRAY, 'cmyk': fitz.csCMYK}
+_MODES = {1: 'L', 3: 'RGB', 4: 'CMYK'}
+
+
+def open_pdf(src):
+    if isinstance(src, fitz.Document):
+        return src
+    with stage('read'):
+        data = src if isinstance(src, (bytes, bytearray)) else src.read()
+    with stage('parse'):
+        return fitz.open(stream=data, filetype='pdf')
+
+
+def render_page(page, dpi=DPI, colorspace='rgb', alpha=False):
+    with stage('render'):
+        return page.get_pixmap(dpi=dpi, colorspace=COLORSPACES[colorspace], alpha=alpha)
+
+
+def to_image(pix):
+    mode = _MODES[pix.n - pix.alpha] + ('A' if pix.alpha else '')
+    return Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+
+
+def render_pages(doc, dpi=DPI, colorspace='rgb', pages=None, alpha=False):
+    """Yield (page_number, Pixmap) for the given 1-based pages (all by default), one page at a time."""
+    for p in pages if pages is not None else range(1, len(doc) + 1):
+        yield p, render_page(doc[p - 1], dpi, colorspace, alpha)
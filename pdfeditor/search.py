@@ -0,0 +1,153 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from pdfeditor.metrics import stage
+from pdfeditor.render import open_pdf
+
+INDEX_PATH = os.environ.get('PDFEDITOR_SEARCH_INDEX',
+                            os.path.join(os.path.expanduser('~'), '.cache', 'pdfeditor', 'search.db'))
+SNIPPET_TOKENS = 16
+LIMIT = 50
+_CONTROL = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')  # never words; free for snippet marks
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (owner TEXT NOT NULL, hash TEXT NOT NULL, name TEXT NOT NULL,
+                                      page_count INTEGER NOT NULL, added REAL NOT NULL, PRIMARY KEY (owner, hash));
+CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5(text, hash UNINDEXED, page UNINDEXED,
+                                                    tokenize='unicode61 remove_diacritics 2');
+"""
+
+
+def match_expression(query):
+    """Turn what a user types into an FTS5 query: every word must appear, a trailing * matches a prefix,
+    and nothing else is treated as query syntax."""
+    terms = []
+    for word in query.split():
+        prefix = word.endswith('*')
+        word = word.rstrip('*').replace('"', '""')
+        if word:
+            terms.append(f'"{word}"' + ('*' if prefix else ''))
+    return ' '.join(terms)
+
+
+class SearchIndex:
+    """Full-text index of page text in SQLite FTS5, keyed on the content hash of each PDF.
+
+    A document's text (its text layer, or OCR for pages without one) is
+    extracted once, when it is first added; adding the same bytes again, under
+    any name, is a lookup.
+
+    Documents belong to an ``owner`` token (the CLI uses the empty one) and
+    searches only see the owner's documents. Identical files share their page
+    text, which is deleted with the last owner's copy.
+    """
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')  # the app and the CLI can share one index file
+        with self._db:
+            columns = {r[1] for r in self._db.execute('PRAGMA table_info(documents)')}
+            if columns and 'owner' not in columns:
+                # indexes from before owners existed: their documents become the CLI's
+                self._db.execute('ALTER TABLE documents RENAME TO documents_unowned')
+                self._db.executescript(_SCHEMA)
+                self._db.execute("INSERT INTO documents SELECT '', hash, name, page_count, added "
+                                 'FROM documents_unowned')
+                self._db.execute('DROP TABLE documents_unowned')
+        self._db.executescript(_SCHEMA)
+
+    def _has_text(self, key):
+        return self._db.execute('SELECT 1 FROM documents WHERE hash = ? LIMIT 1', (key,)).fetchone() is not None
+
+    def add(self, data, name, progress=None, owner='', **ocr_kw):
+        """Index the PDF ``data`` under ``name`` for ``owner``; returns (hash, whether its text had to be
+        extracted)."""
+        from pdfeditor.ocr import extract_text
+        key = hashlib.sha256(data).hexdigest()
+        with self._lock, self._db:
+            # text already extracted for anyone is reused; only the owner's entry is written
+            known = self._db.execute('SELECT page_count FROM documents WHERE hash = ? LIMIT 1', (key,)).fetchone()
+            if known:
+                self._db.execute('INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?)',
+                                 (owner, key, name, known[0], time.time()))
+        if known:
+            return key, False
+        doc = open_pdf(data)
+        try:
+            if doc.needs_pass:
+                raise ValueError('password protected: decrypt it first')
+            total = len(doc)
+            rows = []
+            for page, text in extract_text(doc, **ocr_kw):
+                rows.append((_CONTROL.sub('', text), key, page))
+                if progress:
+                    progress(page, total)
+        finally:
+            doc.close()
+        with stage('index'), self._lock, self._db:
+            # written in one transaction, so a document is either fully searchable or not there at all
+            self._db.execute('DELETE FROM pages WHERE hash = ?', (key,))
+            self._db.executemany('INSERT INTO pages (text, hash, page) VALUES (?, ?, ?)', rows)
+            self._db.execute('INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?)',
+                             (owner, key, name, total, time.time()))
+        return key, True
+
+    def remove(self, key, owner=''):
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM documents WHERE owner = ? AND hash = ?', (owner, key))
+            if not self._has_text(key):
+                self._db.execute('DELETE FROM pages WHERE hash = ?', (key,))
+
+    def clear(self, owner=''):
+        for d in self.documents(owner):
+            self.remove(d['hash'], owner)
+
+    def documents(self, owner=''):
+        with self._lock:
+            rows = self._db.execute('SELECT hash, name, page_count, added FROM documents WHERE owner = ? '
+                                    'ORDER BY added', (owner,)).fetchall()
+        return [{'hash': h, 'name': n, 'pages': p, 'added': a} for h, n, p, a in rows]
+
+    def search(self, query, owner='', limit=LIMIT, mark=('**', '**')):
+        """Best matching pages of ``owner``'s documents first, as dicts of name, hash, page, snippet (hits
+        wrapped in ``mark``) and score (lower is better)."""
+        expr = match_expression(query)
+        if not expr:
+            return []
+        with stage('search'), self._lock:
+            rows = self._db.execute(
+                'SELECT documents.name, pages.hash, pages.page, '
+                "snippet(pages, 0, ?, ?, '…', ?), bm25(pages) "
+                'FROM pages JOIN documents ON documents.hash = pages.hash '
+                'WHERE pages MATCH ? AND documents.owner = ? ORDER BY bm25(pages) LIMIT ?',
+                (*mark, SNIPPET_TOKENS, expr, owner, limit)).fetchall()
+        return [{'name': n, 'hash': h, 'page': int(p), 'snippet': s, 'score': round(b, 3)}
+                for n, h, p, s, b in rows]
+
+    def stats(self, owner=''):
+        with self._lock:
+            docs, pages = self._db.execute('SELECT count(*), coalesce(sum(page_count), 0) FROM documents '
+                                           'WHERE owner = ?', (owner,)).fetchone()
+        size = sum(os.path.getsize(p) for p in (self.path, self.path + '-wal') if os.path.exists(p))
+        return {'documents': docs, 'pages': pages, 'bytes': size}
+
+    def close(self):
+        self._db.close()
+
+
+_default = None
+
+
+def default_index():
+    global _default
+    if _default is None:
+        _default = SearchIndex()
+    return _default
@@ -0,0 +1,43 @@
+import io
+import os
+import shutil
+import tempfile
+
+from pdfeditor.metrics import stage
+
+LARGE_FILE_BYTES = 64 * 1024 * 1024  # uploads above this are processed from disk
+CHUNK = 1024 * 1024
+
+
+class NamedBytesIO(io.BytesIO):
+    # the operations were written against Streamlit uploads, which carry a name
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+
+
+def upload_size(f):
+    size = getattr(f, 'size', None)
+    if size is None:
+        pos = f.tell()
+        size = f.seek(0, os.SEEK_END)
+        f.seek(pos)
+    return size
+
+
+def spool(f, suffix='.pdf'):
+    """Return (path, is_temporary) for a file holding the upload's bytes, copying in chunks unless f
+    is already an open file on disk."""
+    if isinstance(f, io.BufferedReader) and isinstance(f.name, str) and os.path.isfile(f.name):
+        return f.name, False
+    f.seek(0)
+    with stage('spool'), tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        shutil.copyfileobj(f, tmp, CHUNK)
+    return tmp.name, True
+
+
+def disk_output(path):
+    """Open a finished output file for reading and unlink it, so it disappears once the reader closes."""
+    f = open(path, 'rb')
+    os.unlink(path)
+    return f
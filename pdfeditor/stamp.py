@@ -0,0 +1,144 @@
+import io
+import math
+
+import pymupdf as fitz  # PyMuPDF
+from PIL import Image
+
+MARGIN = 36
+POSITIONS = ('center', 'top-left', 'top', 'top-right', 'left', 'right', 'bottom-left', 'bottom', 'bottom-right')
+# label -> str.format template; fields are n (page number), total and prefix
+NUMBER_FORMATS = {
+    '1, 2, 3': '{n}',
+    'Page 1 of N': 'Page {n} of {total}',
+    'Bates (PREFIX000001)': '{prefix}{n:06d}',
+}
+
+
+def text_stamp(text, fontsize=48, color=(0.5, 0.5, 0.5), opacity=0.3):
+    """A one-page document holding just `text`, for use as a watermark."""
+    width = fitz.get_text_length(text, 'helv', fontsize)
+    doc = fitz.open()
+    page = doc.new_page(width=width + 2, height=fontsize * 1.25)
+    page.insert_text((1, fontsize), text, fontsize=fontsize, color=color, fill_opacity=opacity)
+    return doc
+
+
+def image_stamp(data, opacity=0.3, scale=1.0):
+    """A one-page document holding the image `data` with its alpha scaled by `opacity`, 1px = 0.75pt * scale."""
+    im = Image.open(io.BytesIO(data)).convert('RGBA')
+    im.putalpha(im.getchannel('A').point(lambda a: round(a * opacity)))
+    buf = io.BytesIO()
+    im.save(buf, 'PNG')
+    doc = fitz.open()
+    page = doc.new_page(width=im.width * 0.75 * scale, height=im.height * 0.75 * scale)
+    page.insert_image(page.rect, stream=buf.getvalue())
+    return doc
+
+
+def anchor(rect, position, width, height, margin=MARGIN):
+    """Centre point of a width x height box placed at `position` inside `rect`."""
+    if position not in POSITIONS:
+        raise ValueError(f'Unknown position: {position}')
+    x = rect.x0 + rect.width / 2
+    y = rect.y0 + rect.height / 2
+    if position.endswith('left'):
+        x = rect.x0 + margin + width / 2
+    elif position.endswith('right'):
+        x = rect.x1 - margin - width / 2
+    if position.startswith('top'):
+        y = rect.y0 + margin + height / 2
+    elif position.startswith('bottom'):
+        y = rect.y1 - margin - height / 2
+    return fitz.Point(x, y)
+
+
+def _form(doc, mark):
+    # graft the stamp page into doc once as a Form XObject, by way of a scratch page
+    page = doc.new_page(width=mark[0].rect.width, height=mark[0].rect.height)
+    xref = page.show_pdf_page(page.rect, mark, 0)
+    doc.delete_page(-1)
+    return xref
+
+
+def _stream(doc, data):
+    xref = doc.get_new_xref()
+    doc.update_object(xref, '<<>>')
+    doc.update_stream(xref, data)
+    return xref
+
+
+def _add_resource(doc, page_xref, name, xref):
+    kind, value = doc.xref_get_key(page_xref, 'Resources')
+    node = page_xref
+    while kind == 'null':
+        # inherited from a /Pages node: give the page its own copy so it can be extended
+        parent = doc.xref_get_key(node, 'Parent')
+        if parent[0] != 'xref':
+            value = '<<>>'
+            break
+        node = int(parent[1].split()[0])
+        kind, value = doc.xref_get_key(node, 'Resources')
+    if kind == 'xref':
+        # shared resource dictionaries only need the entry once, setting it again is a no-op
+        doc.xref_set_key(int(value.split()[0]), f'XObject/{name}', f'{xref} 0 R')
+        return
+    if node != page_xref:
+        doc.xref_set_key(page_xref, 'Resources', value)
+    doc.xref_set_key(page_xref, f'Resources/XObject/{name}', f'{xref} 0 R')
+
+
+def _placement(page, size, position, angle, margin):
+    # matrix taking the form's own space onto the page's PDF space
+    w, h = size
+    rad = math.radians(angle)
+    bw = abs(w * math.cos(rad)) + abs(h * math.sin(rad))
+    bh = abs(w * math.sin(rad)) + abs(h * math.cos(rad))
+    rect = page.rect
+    scale = min(1, (rect.width - 2 * margin) / bw, (rect.height - 2 * margin) / bh)
+    centre = anchor(rect, position, bw * scale, bh * scale, margin)
+    m = fitz.Matrix(1, 0, 0, -1, -w / 2, h / 2)  # form space (y up) -> centred, y down
+    m *= fitz.Matrix(scale, scale) * fitz.Matrix(-angle)
+    m *= fitz.Matrix(1, 0, 0, 1, centre.x, centre.y)
+    # unrotated page space -> PDF space; ~page.transformation_matrix is off for rotated, cropped pages
+    cb = page.cropbox
+    return m * page.derotation_matrix * fitz.Matrix(1, 0, 0, -1, cb.x0, page.mediabox.y1 - cb.y0)
+
+
+def stamp(doc, mark=None, position='center', angle=0, number=None, number_position='bottom', start=1,
+          prefix='', fontsize=10, margin=MARGIN):
+    """Stamp every page of `doc` in one pass with the one-page document `mark` and/or the page-number
+    template `number` (see NUMBER_FORMATS).
+
+    The mark is embedded once as a Form XObject; each page only gains a reference to it and a shared
+    placement stream, so the output grows by a few bytes per page rather than a copy of the mark.
+    """
+    total = len(doc) + start - 1
+    if number:
+        try:
+            number.format(n=start, total=total, prefix=prefix)
+        except (KeyError, IndexError, ValueError) as e:
+            raise ValueError(f'Bad number format: {number}') from e
+    if mark is not None:
+        size = (mark[0].rect.width, mark[0].rect.height)
+        form = _form(doc, mark)
+        name = f'pdfeStamp{form}'
+        push = _stream(doc, b'q\n')
+        placements = {}  # one shared stream per distinct page geometry
+    for i, page in enumerate(doc):
+        if mark is not None:
+            m = _placement(page, size, position, angle, margin)
+            key = tuple(round(v, 3) for v in m)
+            if key not in placements:
+                cm = ' '.join(f'{v:.3f}' for v in key)
+                placements[key] = _stream(doc, f'Q\nq {cm} cm /{name} Do Q\n'.encode())
+            xref = page.xref  # a lookup through the page tree, not an attribute
+            _add_resource(doc, xref, name, form)
+            contents = [push, *page.get_contents(), placements[key]]
+            doc.xref_set_key(xref, 'Contents', '[' + ' '.join(f'{x} 0 R' for x in contents) + ']')
+        if number:
+            text = number.format(n=start + i, total=total, prefix=prefix)
+            width = fitz.get_text_length(text, 'helv', fontsize)
+            c = anchor(page.rect, number_position, width, fontsize, margin)
+            # insert_text works in unrotated coordinates; turn the text with the page so it reads upright
+            origin = fitz.Point(c.x - width / 2, c.y + fontsize * 0.35) * page.derotation_matrix
+            page.insert_text(origin, text, fontsize=fontsize, rotate=page.rotation)
@@ -0,0 +1,172 @@
+import io
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import pymupdf as fitz  # PyMuPDF
+import numpy as np
+
+from pdfeditor.metrics import stage
+from pdfeditor.ocr import LANG, has_text_layer
+from pdfeditor.render import render_page, to_image
+
+OCR_DPI = 300
+ROW_TOL = 0.5   # word centres closer than this many line heights share a row
+CELL_GAP = 0.8  # words further apart than this many line heights start a new cell
+TABLE_GAP = 3.0  # a vertical gap this many line heights ends a table
+_DIGITS = r'(?:(?:0|[1-9]\d*|[1-9]\d{0,2}(?:,\d{3})+)(?:\.\d+)?|\.\d+)'  # no leading zeros, commas every 3
+_NUMBER = re.compile(rf'^(-?{_DIGITS}|\({_DIGITS}\))$')  # 1,234.5 or accounting-style (12.5); not 007 or 1,2,3
+
+
+def page_words(page, dpi=OCR_DPI, lang=LANG):
+    """Return (boxes, texts) for the words on a page, as an (n, 4) array in PDF points and a list.
+
+    Pages without a usable text layer are run through tesseract's image_to_data instead.
+    """
+    words = page.get_text('words')
+    if has_text_layer(' '.join(w[4] for w in words)):
+        return np.array([w[:4] for w in words], dtype=float).reshape(-1, 4), [w[4] for w in words]
+    import pytesseract
+    im = to_image(render_page(page, dpi, 'gray'))
+    with stage('ocr'):
+        try:
+            d = pytesseract.image_to_data(im, lang=lang, output_type=pytesseract.Output.DICT)
+        except pytesseract.TesseractNotFoundError as e:
+            # this exception cannot be unpickled, which would surface as a BrokenProcessPool in the parent
+            raise RuntimeError(str(e)) from None
+    keep = [i for i, t in enumerate(d['text']) if t.strip() and float(d['conf'][i]) >= 0]
+    left, top = np.array(d['left'], float)[keep], np.array(d['top'], float)[keep]
+    right = left + np.array(d['width'], float)[keep]
+    bottom = top + np.array(d['height'], float)[keep]
+    boxes = np.stack([left, top, right, bottom], axis=1).reshape(-1, 4) * (72 / dpi)
+    return boxes, [d['text'][i] for i in keep]
+
+
+def _rows(boxes, texts, height):
+    # cluster words into rows by vertical centre, then into cells by horizontal gaps
+    yc = (boxes[:, 1] + boxes[:, 3]) / 2
+    order = np.argsort(yc, kind='stable')
+    row_of = np.empty(len(boxes), dtype=int)
+    row_of[order] = np.concatenate([[0], np.cumsum(np.diff(yc[order]) > ROW_TOL * height)])
+    rows = []
+    for r in range(row_of.max() + 1):
+        idx = np.flatnonzero(row_of == r)
+        idx = idx[np.argsort(boxes[idx, 0], kind='stable')]
+        x0, x1 = boxes[idx, 0], boxes[idx, 2]
+        starts = np.concatenate([[True], x0[1:] - np.maximum.accumulate(x1)[:-1] > CELL_GAP * height])
+        bounds = np.flatnonzero(starts).tolist() + [len(idx)]
+        cells = [(x0[a], np.max(x1[a:b]), ' '.join(texts[i] for i in idx[a:b])) for a, b in zip(bounds, bounds[1:])]
+        rows.append((yc[idx].mean(), cells))
+    return rows
+
+
+def _columns(rows):
+    # columns are the gaps left in the union of every cell's horizontal extent
+    x0 = np.array([c[0] for _, cells in rows for c in cells])
+    x1 = np.array([c[1] for _, cells in rows for c in cells])
+    order = np.argsort(x0, kind='stable')
+    reach = np.maximum.accumulate(x1[order])
+    starts = x0[order][np.concatenate([[True], x0[order][1:] > reach[:-1]])]
+    table = []
+    for _, cells in rows:
+        out = [''] * len(starts)
+        for cx0, _, text in cells:
+            col = np.searchsorted(starts, cx0, side='right') - 1
+            out[col] = f'{out[col]} {text}'.strip()
+        table.append(out)
+    return table
+
+
+def detect_tables(boxes, texts):
+    """Return (tables, lines): each table is a list of rows of cell strings; lines are all rows' cells."""
+    if not len(boxes):
+        return [], []
+    height = float(np.median(boxes[:, 3] - boxes[:, 1])) or 1.0
+    rows = _rows(boxes, texts, height)
+    tables, run = [], []
+    for y, cells in rows + [(np.inf, [])]:
+        # a table is two or more consecutive multi-cell rows without a large vertical gap
+        if len(cells) >= 2 and (not run or y - run[-1][0] <= TABLE_GAP * height):
+            run.append((y, cells))
+            continue
+        if len(run) >= 2:
+            tables.append(_columns(run))
+        run = [(y, cells)] if len(cells) >= 2 else []
+    return tables, [[c[2] for c in cells] for _, cells in rows]
+
+
+def page_tables(page, dpi=OCR_DPI, lang=LANG):
+    return detect_tables(*page_words(page, dpi, lang))
+
+
+_doc = None
+
+
+def _init(data):
+    global _doc
+    _doc = fitz.open(stream=data, filetype='pdf')
+
+
+def _worker_page(pno, dpi, lang):
+    return page_tables(_doc[pno], dpi, lang)
+
+
+def _cell(text):
+    if _NUMBER.match(text):
+        try:
+            v = float(text.strip('()').replace(',', ''))
+        except ValueError:
+            return text
+        return -v if text.startswith('(') else v
+    return text
+
+
+def tables_to_xlsx(uploaded_file, workers=None, progress=None, dpi=OCR_DPI, lang=LANG):
+    """Write one sheet per detected table, streaming rows into a write-only workbook as pages finish.
+
+    Pages are analysed in parallel worker processes, in page order. A document
+    without any table gets a single sheet with every text line instead.
+    """
+    from openpyxl import Workbook
+
+    if isinstance(uploaded_file, fitz.Document):
+        doc, data = uploaded_file, None  # serialized only if a process pool starts
+    else:
+        data = uploaded_file.read()
+        doc = fitz.open(stream=data, filetype='pdf')
+    n = len(doc)
+    workers = min(workers or os.cpu_count(), n) or 1
+    wb = Workbook(write_only=True)
+    lines = []  # kept only until the first table shows up
+    found = False
+    if workers == 1:
+        results = (page_tables(doc[p], dpi, lang) for p in range(n))
+        ex = None
+    else:
+        ex = ProcessPoolExecutor(workers, initializer=_init, initargs=(data or doc.tobytes(),))
+        results = ex.map(_worker_page, range(n), [dpi] * n, [lang] * n)
+    try:
+        for pno, (tables, page_lines) in enumerate(results):
+            for t, rows in enumerate(tables, 1):
+                ws = wb.create_sheet(f'p{pno + 1}_t{t}')
+                for row in rows:
+                    ws.append([_cell(c) for c in row])
+                found = True
+            if not found:
+                lines.extend(page_lines)
+            if progress:
+                progress(pno + 1, n)
+    finally:
+        if ex:
+            ex.shutdown(cancel_futures=True)
+        if doc is not uploaded_file:
+            doc.close()
+    if not found:
+        ws = wb.create_sheet('Text')
+        for row in lines:
+            ws.append(row)
+    buf = io.BytesIO()
+    with stage('save'):
+        wb.save(buf)
+    buf.seek(0)
+    return buf
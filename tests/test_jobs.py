@@ -0,0 +1,54 @@
+import time
+
+import pymupdf
+import pytest
+
+from pdfeditor.jobs import FINISHED, JobQueue
+
+
+def _wait(jobs, job_id, owner):
+    for _ in range(200):
+        job = jobs.get(job_id, owner)
+        if job['status'] in FINISHED:
+            return job
+        time.sleep(0.05)
+    raise TimeoutError(job_id)
+
+
+@pytest.fixture
+def jobs(tmp_path):
+    doc = pymupdf.open()
+    doc.new_page()
+    jobs = JobQueue(str(tmp_path), workers=1)
+    job_id = jobs.submit('alice', 'Rotate PDF', 'a.pdf', doc.tobytes(), rotation_angle=90)
+    assert _wait(jobs, job_id, 'alice')['status'] == 'done'
+    return jobs, job_id
+
+
+def test_other_owners_cannot_see_or_touch_a_job(jobs):
+    jobs, job_id = jobs
+    assert jobs.list('bob') == []
+    assert jobs.get(job_id, 'bob') is None
+    with pytest.raises(KeyError):
+        jobs.read(job_id, 'bob')
+    jobs.remove(job_id, 'bob')
+    assert not jobs.cancel(job_id, 'bob')
+    assert [j['id'] for j in jobs.list('alice')] == [job_id]
+    assert jobs.read(job_id, 'alice').startswith(b'%PDF')
+
+
+def test_jobs_need_an_owner(jobs):
+    jobs, job_id = jobs
+    assert jobs.list('') == []
+    with pytest.raises(ValueError):
+        jobs.submit('', 'Rotate PDF', 'a.pdf', b'')
+
+
+def test_expire_deletes_old_results(jobs):
+    jobs, job_id = jobs
+    result = jobs.get(job_id, 'alice')['result']
+    jobs.retention = 0
+    jobs.expire()
+    assert jobs.get(job_id, 'alice') is None
+    with pytest.raises(FileNotFoundError):
+        open(result, 'rb')
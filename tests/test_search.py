@@ -0,0 +1,60 @@
+import pytest
+
+from pdfeditor.search import SearchIndex, match_expression
+
+
+@pytest.mark.parametrize('query, expr', [
+    ('invoice', '"invoice"'),
+    ('total  due', '"total" "due"'),
+    ('inv*', '"inv"*'),
+    ('say "hi"', '"say" """hi"""'),
+    ('NOT OR AND', '"NOT" "OR" "AND"'),
+    ('col:value (a) -b ^c', '"col:value" "(a)" "-b" "^c"'),
+    ('* **', ''),
+    ('', ''),
+])
+def test_match_expression(query, expr):
+    assert match_expression(query) == expr
+
+
+@pytest.mark.parametrize('query', ['"', 'a"b', 'NEAR(a b)', 'x OR', '*a', "it's"])
+def test_match_expression_is_always_valid_fts5(query):
+    index = SearchIndex(':memory:')
+    try:
+        assert index.search(query) == []
+    finally:
+        index.close()
+
+
+def _pdf(text):
+    import pymupdf
+    doc = pymupdf.open()
+    doc.new_page().insert_text((72, 72), text)
+    return doc.tobytes()
+
+
+@pytest.fixture
+def index():
+    index = SearchIndex(':memory:')
+    yield index
+    index.close()
+
+
+def test_owners_only_see_their_own_documents(index):
+    key, new = index.add(_pdf('quarterly invoice for alice and her accountant'), 'a.pdf', owner='alice')
+    assert new
+    assert [h['name'] for h in index.search('invoice', 'alice')] == ['a.pdf']
+    assert index.search('invoice', 'bob') == []
+    assert index.documents('bob') == []
+    assert index.stats('bob')['documents'] == 0
+
+
+def test_clear_keeps_text_another_owner_shares(index):
+    data = _pdf('shared contract between two separate owners of one file')
+    key, _ = index.add(data, 'mine.pdf', owner='alice')
+    assert index.add(data, 'theirs.pdf', owner='bob') == (key, False)  # text reused, not extracted again
+    index.clear('alice')
+    assert index.search('contract', 'alice') == []
+    assert [h['name'] for h in index.search('contract', 'bob')] == ['theirs.pdf']
+    index.clear('bob')
+    assert index._db.execute('SELECT count(*) FROM pages').fetchone()[0] == 0
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from pdfeditor.tables import _cell, _columns, detect_tables
+
+
+def _words(*rows):
+    # rows of (x0, x1, text) at 15pt line spacing, every word 10pt tall
+    boxes, texts = [], []
+    for i, row in enumerate(rows):
+        y = 100 + 15 * i
+        for x0, x1, text in row:
+            boxes.append((x0, y, x1, y + 10))
+            texts.append(text)
+    return np.array(boxes, dtype=float).reshape(-1, 4), texts
+
+
+def test_detect_tables_splits_columns_on_gaps():
+    boxes, texts = _words(
+        [(72, 100, 'Name'), (200, 215, 'Qty')],
+        [(72, 95, 'Apple'), (200, 206, '3')],
+        [(72, 90, 'Pear'), (200, 210, '12')],
+    )
+    tables, lines = detect_tables(boxes, texts)
+    assert tables == [[['Name', 'Qty'], ['Apple', '3'], ['Pear', '12']]]
+    assert lines == [['Name', 'Qty'], ['Apple', '3'], ['Pear', '12']]
+
+
+def test_detect_tables_joins_close_words_into_one_cell():
+    boxes, texts = _words(
+        [(72, 90, 'Red'), (92, 115, 'apple'), (200, 206, '3')],
+        [(72, 90, 'Pear'), (200, 210, '12')],
+    )
+    tables, _ = detect_tables(boxes, texts)
+    assert tables == [[['Red apple', '3'], ['Pear', '12']]]
+
+
+def test_detect_tables_ignores_prose_and_ends_tables_at_large_gaps():
+    boxes, texts = _words(
+        [(72, 90, 'Some'), (92, 110, 'prose'), (112, 130, 'here')],
+        [(72, 80, 'a'), (200, 206, '1')],
+        [(72, 80, 'b'), (200, 206, '2')],
+        [],
+        [],
+        [],
+        [(72, 80, 'c'), (300, 306, '3')],
+        [(72, 80, 'd'), (300, 306, '4')],
+    )
+    tables, lines = detect_tables(boxes, texts)
+    assert tables == [[['a', '1'], ['b', '2']], [['c', '3'], ['d', '4']]]
+    assert lines[0] == ['Some prose here']
+
+
+def test_detect_tables_without_words():
+    assert detect_tables(np.empty((0, 4)), []) == ([], [])
+
+
+def test_columns_leave_missing_cells_empty():
+    rows = [(0, [(0, 10, 'a'), (50, 60, 'b'), (100, 110, 'c')]),
+            (15, [(0, 10, 'd'), (100, 110, 'f')])]
+    assert _columns(rows) == [['a', 'b', 'c'], ['d', '', 'f']]
+
+
+@pytest.mark.parametrize('text, value', [
+    ('0', 0.0), ('12', 12.0), ('-3.5', -3.5), ('0.25', 0.25), ('.5', 0.5), ('1234', 1234.0),
+    ('1,234', 1234.0), ('1,234,567.89', 1234567.89), ('(12.5)', -12.5), ('(1,000)', -1000.0),
+])
+def test_cell_parses_numbers(text, value):
+    assert _cell(text) == value
+
+
+@pytest.mark.parametrize('text', ['007', '00', '1,2,3', '12,34', '1234,567', ',5', '1.', '-(5)', 'abc', 'A1', ''])
+def test_cell_keeps_other_text(text):
+    assert _cell(text) == text